@@ -0,0 +1,149 @@
+"""
+Controle de admissão dos endpoints que custam um hash de senha.
+
+Em campanhas, bots disparam /api/login e /api/register sem parar; cada tentativa
+é um hash completo e o checkout no mesmo worker fica sem CPU. Antes de qualquer
+hash ou consulta ao banco, cada requisição passa por:
+
+- token buckets por IP e, no login, por email: acima da taxa, 429 com o
+  Retry-After de quando haverá uma nova ficha;
+- um limite de requisições simultâneas por endpoint, com uma fila curta e
+  espera máxima: sem vaga, 503 com Retry-After.
+
+Os limites valem por processo (com o serve.py, multiplique pelos workers) e
+as recusas aparecem em /metrics como admission_rejections_total.
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import jsonify, request
+
+from metrics import Counter, Gauge
+
+
+class RateLimit:
+    """Token bucket por chave: `capacity` tentativas, repostas ao longo de `period` segundos."""
+
+    def __init__(self, capacity, period, max_keys=100000):
+        self.capacity = capacity
+        self.rate = capacity / period
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def parse(cls, spec):
+        """'10/60' -> 10 tentativas por minuto; vazio ou '0' desativa."""
+        if not spec or spec.strip() == '0':
+            return None
+        capacity, _, period = spec.partition('/')
+        return cls(int(capacity), float(period or 60))
+
+    def take(self, key):
+        """Gasta uma ficha. Retorna 0 se havia ficha, ou os segundos até a próxima."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.pop(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - stamp) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            # Mais recente no fim; acima do limite sai a chave parada há mais tempo
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class ConcurrencyLimit:
+    """Até `limit` requisições ao mesmo tempo e até `queue` esperando no máximo `timeout` s."""
+
+    def __init__(self, limit, queue=0, timeout=1.0):
+        self.limit = limit
+        self.queue = queue
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        with self._condition:
+            if self.active < self.limit:
+                self.active += 1
+                return True
+            if self.waiting >= self.queue:
+                return False
+            self.waiting += 1
+            try:
+                if not self._condition.wait_for(lambda: self.active < self.limit, self.timeout):
+                    return False
+                self.active += 1
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self):
+        with self._condition:
+            self.active -= 1
+            self._condition.notify()
+
+
+class AdmissionControl:
+    def __init__(self, metrics=None):
+        self.rejections = Counter('admission_rejections_total', 'Requisições recusadas pelo controle de admissão.',
+                                  ('endpoint', 'reason'))
+        self.waiting = Gauge('admission_queue_waiting', 'Requisições esperando vaga.', ('endpoint',))
+        if metrics is not None:
+            metrics.register(self.rejections)
+            metrics.register(self.waiting)
+
+    def guard(self, name, concurrency=None, ip_rate=None, email_rate=None):
+        """Decorator da view com os limites do endpoint `name`; None desativa cada um."""
+        def decorator(view):
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                # Atrás de proxy reverso, remote_addr vem do ProxyFix (TRUSTED_PROXIES no app.py)
+                if ip_rate is not None:
+                    wait = ip_rate.take(request.remote_addr or '-')
+                    if wait:
+                        return self._reject(name, 'ip_rate', 429, wait)
+                if email_rate is not None:
+                    data = request.get_json(silent=True)
+                    email = data.get('email') if isinstance(data, dict) else None
+                    if isinstance(email, str) and email.strip():
+                        wait = email_rate.take(email.strip().lower())
+                        if wait:
+                            return self._reject(name, 'email_rate', 429, wait)
+                if concurrency is None:
+                    return view(*args, **kwargs)
+
+                self.waiting.inc((name,))
+                try:
+                    admitted = concurrency.acquire()
+                finally:
+                    self.waiting.dec((name,))
+                if not admitted:
+                    return self._reject(name, 'concurrency', 503, 1)
+                try:
+                    return view(*args, **kwargs)
+                finally:
+                    concurrency.release()
+            return wrapper
+        return decorator
+
+    def _reject(self, name, reason, status, retry_after):
+        self.rejections.inc((name, reason))
+        if status == 429:
+            message = 'Muitas tentativas, tente novamente em instantes'
+        else:
+            message = 'Servidor ocupado, tente novamente em instantes'
+        response = jsonify({'error': message})
+        response.status_code = status
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
@@ -1,38 +1,305 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, session, jsonify, render_template, abort, stream_with_context
 from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
-from models import db, User, Course, Order
+from jinja2 import TemplateNotFound
+from models import db, User, Course, Order, LessonProgress, Availability, Booking
+from database import init_database, create_schema, seed_courses, use_maintenance_timeout
+from catalog import catalog
+from hashing import PasswordHasher, HashQueueFull
+from orders import OrderWriter, IdempotencyConflict, OrderQueueTimeout
+from pages import PageStore, build_pages, list_pages
+from assets import AssetBundler, send_file_max_age
+from images import ImageBuilder, available as images_available
+from stats import dashboard_stats, rebuild_rollups
+from students import list_students, InvalidCursor, DEFAULT_LIMIT
+from exports import export, MIMETYPES
+from projections import ADMIN_ORDER, json_response, stream_array
+from importer import import_students, write_errors
+from search import search_courses, suggest_courses
+from gateway import GatewayError, gateway_from_env, start_checkout
+from metrics import RequestMetrics
+from admission import AdmissionControl, ConcurrencyLimit, RateLimit
+from webhooks import PaymentEventProcessor, InvalidEvent, record_event, apply_pending
+from progress import ProgressBuffer
+from library import Library, build_index
+from entitlements import entitlements, has_access
+from slots import SlotEngine, InvalidSlot, SlotTaken, BookingConflict, validate_windows
 from dotenv import load_dotenv
+from werkzeug.middleware.proxy_fix import ProxyFix
+from datetime import date, datetime, timedelta
+from functools import wraps
+import atexit
+import click
+import hmac
+import io
 import os
+import secrets
 
 load_dotenv()
 
-# Configuração Padrão Flask (templates/ e static/ são automáticos)
-app = Flask(__name__)
+basedir = os.path.abspath(os.path.dirname(__file__))
+
+# As páginas HTML ficam na raiz do projeto; static/ é o padrão do Flask
+app = Flask(__name__, template_folder=basedir)
 CORS(app) 
 
+# Quantos proxies reversos ficam na frente do app (0 = nenhum, o cliente
+# conecta direto). Sem TRUSTED_PROXIES o IP do cliente não é confiável:
+# X-Forwarded-For é ignorado e os limites por IP ficam desligados
+TRUSTED_PROXIES = int(os.environ['TRUSTED_PROXIES']) if os.getenv('TRUSTED_PROXIES') else None
+if TRUSTED_PROXIES:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=TRUSTED_PROXIES, x_proto=TRUSTED_PROXIES)
+
 # Configuração do Banco de Dados
-basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URL', 'sqlite:///' + os.path.join(basedir, 'agape.db'))
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SECRET_KEY'] = 'uma-chave-secreta-muito-segura'
+# Assina o cookie de sessão que identifica o aluno. Sem SECRET_KEY cada start
+# gera uma chave nova e os alunos precisam entrar de novo (o serve.py exige a
+# variável: cada worker teria a sua chave)
+app.config['SECRET_KEY'] = os.getenv('SECRET_KEY') or secrets.token_hex(32)
+app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
+
+# Perfil do engine escolhido por DB_PROFILE (ver database.py)
+init_database(app, os.getenv('DATABASE_URL', 'sqlite:///' + os.path.join(basedir, 'agape.db')))
+
+# Latência por endpoint e contagem de consultas, expostas em /metrics. Com
+# METRICS_DIR (definido pelo serve.py) o /metrics soma todos os workers
+metrics = RequestMetrics(slow_query_ms=float(os.getenv('SLOW_QUERY_MS', '200')),
+                         shared_dir=os.getenv('METRICS_DIR') or None)
+metrics.init_app(app)
+
+# Acertos e faltas do cache de cursos liberados (ver entitlements.py)
+metrics.register(entitlements.lookups)
+
+# Hash de senhas em pool de processos (PASSWORD_HASH_WORKERS=0 executa inline)
+hasher = PasswordHasher(
+    method=os.getenv('PASSWORD_HASH_METHOD', 'scrypt'),
+    workers=int(os.environ['PASSWORD_HASH_WORKERS']) if os.getenv('PASSWORD_HASH_WORKERS') else None,
+    max_pending=int(os.getenv('PASSWORD_HASH_QUEUE', '0')) or None
+)
+
+# Importações pelo painel usam um pool de hash próprio, para não ocupar os
+# processos que atendem login e cadastro
+import_hasher = PasswordHasher(
+    method=hasher.method,
+    workers=int(os.getenv('IMPORT_HASH_WORKERS', '1')),
+)
+
+# Limites de login/cadastro, aplicados antes do hash (ver admission.py).
+# Taxas no formato "tentativas/segundos"; vazio ou 0 desativa. Os limites
+# por IP só valem com TRUSTED_PROXIES definido
+admission = AdmissionControl(metrics)
+
+def ip_rate_limit(spec):
+    return RateLimit.parse(spec) if TRUSTED_PROXIES is not None else None
+
+login_guard = admission.guard(
+    'login',
+    concurrency=ConcurrencyLimit(int(os.getenv('LOGIN_CONCURRENCY', '0')) or max(1, hasher.workers),
+                                 queue=int(os.getenv('LOGIN_QUEUE', '16')),
+                                 timeout=float(os.getenv('LOGIN_QUEUE_TIMEOUT', '2'))),
+    ip_rate=ip_rate_limit(os.getenv('LOGIN_RATE_IP', '20/60')),
+    email_rate=RateLimit.parse(os.getenv('LOGIN_RATE_EMAIL', '5/60'))
+)
+register_guard = admission.guard(
+    'register',
+    concurrency=ConcurrencyLimit(int(os.getenv('REGISTER_CONCURRENCY', '0')) or max(1, hasher.workers),
+                                 queue=int(os.getenv('REGISTER_QUEUE', '8')),
+                                 timeout=float(os.getenv('REGISTER_QUEUE_TIMEOUT', '2'))),
+    ip_rate=ip_rate_limit(os.getenv('REGISTER_RATE_IP', '5/60'))
+)
+# Uma importação por vez em cada worker; as demais recebem 503
+import_guard = admission.guard('import', concurrency=ConcurrencyLimit(1))
+
+# Pedidos são gravados em grupo por uma thread dedicada
+order_writer = OrderWriter(
+    app,
+    batch_size=int(os.getenv('ORDER_BATCH_SIZE', '64')),
+    max_delay=float(os.getenv('ORDER_BATCH_DELAY_MS', '5')) / 1000
+)
+
+# Cliente do Asaas com pool de conexões; sem ASAAS_API_KEY (desenvolvimento)
+# a compra é registrada como paga direto, sem cobrança
+gateway = gateway_from_env()
+
+# Webhooks de pagamento vão para uma outbox aplicada em segundo plano
+payment_events = PaymentEventProcessor(
+    app,
+    batch_size=int(os.getenv('PAYMENT_EVENT_BATCH_SIZE', '200'))
+)
+
+# Heartbeats do player ficam em memória e vão ao banco em lote
+progress_buffer = ProgressBuffer(
+    app,
+    max_pending=int(os.getenv('PROGRESS_MAX_PENDING', '5000')),
+    flush_interval=float(os.getenv('PROGRESS_FLUSH_INTERVAL', '2')),
+    metrics=metrics
+)
 
-db.init_app(app)
+def shutdown():
+    """Grava o que ainda está só em memória; chamado ao sair do processo."""
+    progress_buffer.flush()
+
+atexit.register(shutdown)
+
+# Horários livres da agenda, calculados por dia e mantidos em memória
+slot_engine = SlotEngine(
+    ttl=float(os.getenv('SLOTS_CACHE_TTL', '30')),
+    horizon_days=int(os.getenv('SLOTS_HORIZON_DAYS', '90'))
+)
+
+# Bundles de static/dist têm hash no nome e recebem cache de um ano
+app.get_send_file_max_age = send_file_max_age
+
+# Páginas pré-renderizadas por `flask build-pages`
+page_store = PageStore(os.getenv('PAGES_BUILD_DIR', os.path.join(basedir, 'build', 'pages')))
+
+# PDFs e vídeos da biblioteca, um diretório por curso (ver library.py)
+library = Library(os.getenv('LIBRARY_DIR', os.path.join(basedir, 'library')))
 
 # --- Inicialização do Banco de Dados ---
-with app.app_context():
-    db.create_all()
-    if not Course.query.first():
-        initial_courses = [
-            Course(id='combo', name='Combo Completo (2 em 1)', price=497.00, description='Terapia Capilar + Massagem'),
-            Course(id='terapia-capilar', name='Pilar 1: Terapia Capilar', price=297.00, description='Curso de Terapia Capilar'),
-            Course(id='massagem', name='Pilar 2: Massagem Terapêutica', price=297.00, description='Curso de Massagem Terapêutica')
-        ]
-        db.session.add_all(initial_courses)
-        db.session.commit()
+# Nada é feito no banco durante o import: schema e dados iniciais são
+# aplicados uma vez por deploy com `flask db-init`
+@app.cli.command('db-init')
+def db_init():
+    """Cria/atualiza o schema e popula os cursos padrão."""
+    use_maintenance_timeout(app)
+    create_schema()
+    click.echo('Schema atualizado.')
+    if seed_courses():
+        click.echo('Cursos padrão criados.')
+
+@app.cli.command('build-pages')
+def build_pages_command():
+    """Renderiza e comprime todas as páginas HTML."""
+    bundler = AssetBundler(basedir, app.static_folder)
+    images = ImageBuilder(basedir, app.static_folder) if images_available() else None
+    if not list_pages(app):
+        raise click.ClickException(f'Nenhuma página HTML encontrada em {app.template_folder}')
+    manifest = build_pages(app, page_store.output_dir, bundler, images)
+    click.echo(f'{len(manifest)} páginas geradas em {page_store.output_dir}')
+    click.echo(f"{len(bundler.manifest['bundles'])} bundles em {bundler.output_dir}")
+    if images is None:
+        click.echo('Pillow não instalado: imagens sem derivados')
+    else:
+        click.echo(f'{images.generated} derivados de imagem novos em {images.output_dir}')
+
+@app.cli.command('build-images')
+def build_images_command():
+    """Gera os derivados (AVIF/WebP/PNG por largura) das imagens de static/img."""
+    if not images_available():
+        raise click.ClickException('Instale o Pillow para gerar as imagens')
+    images = ImageBuilder(basedir, app.static_folder)
+    processed = images.build_all()
+    images.write_manifest()
+    click.echo(f'{len(processed)} imagens, {images.generated} derivados novos em {images.output_dir}')
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Gera só os bundles de JS/CSS das páginas, sem pré-renderizá-las."""
+    bundler = AssetBundler(basedir, app.static_folder)
+    for name in list_pages(app):
+        with app.test_request_context('/' + name):
+            bundler.rewrite(name, render_template(name))
+    bundler.write_manifest()
+    click.echo(f"{len(bundler.manifest['bundles'])} bundles em {bundler.output_dir}")
+
+@app.cli.command('library-index')
+def library_index_command():
+    """Grava tamanho e hash de cada material da biblioteca."""
+    if not os.path.isdir(library.root):
+        raise click.ClickException(f'Diretório da biblioteca não encontrado: {library.root}')
+    index = build_index(library.root)
+    library.reload()
+    click.echo(f'{len(index)} materiais indexados em {library.root}')
+
+@app.cli.command('stats-rebuild')
+def stats_rebuild_command():
+    """Recalcula os agregados diários do painel a partir dos pedidos."""
+    use_maintenance_timeout(app)
+    click.echo(f'{rebuild_rollups()} agregados recalculados.')
+
+@app.cli.command('import-students')
+@click.argument('csv_file', type=click.File('r', encoding='utf-8-sig'))
+@click.option('--errors', 'errors_file', type=click.File('w', encoding='utf-8'), help='CSV com as linhas rejeitadas')
+@click.option('--batch-size', default=1000, show_default=True)
+def import_students_command(csv_file, errors_file, batch_size):
+    """Importa alunos e matrículas de um CSV (name,email,password,phone,courses)."""
+    def progress(report):
+        click.echo(f'{report.rows} linhas lidas, {report.created_users} alunos criados, '
+                   f'{report.orders} matrículas, {len(report.errors)} erros')
+
+    # Processo só da importação: pode usar o pool de hash inteiro
+    use_maintenance_timeout(app)
+    report = import_students(csv_file, hasher, batch_size=batch_size, progress=progress)
+    click.echo(f'Concluído: {report.to_dict()}')
+    if errors_file and report.errors:
+        write_errors(report, errors_file)
+        click.echo(f'Linhas rejeitadas em {errors_file.name}')
+
+@app.cli.command('payments-apply')
+def payments_apply_command():
+    """Aplica aos pedidos todos os eventos de pagamento pendentes na outbox."""
+    total = 0
+    while True:
+        processed = apply_pending(payment_events.batch_size)
+        if not processed:
+            break
+        total += processed
+    click.echo(f'{total} eventos de pagamento aplicados.')
 
 # --- Rotas de API ---
+@app.errorhandler(HashQueueFull)
+def hash_queue_full(error):
+    admission.rejections.inc((request.endpoint, 'hash_queue'))
+    response = jsonify({'error': 'Servidor ocupado, tente novamente em instantes'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+@app.errorhandler(OrderQueueTimeout)
+def order_queue_timeout(error):
+    admission.rejections.inc((request.endpoint, 'order_queue'))
+    # Repetir com a mesma Idempotency-Key não cria um segundo pedido
+    response = jsonify({'error': 'Servidor ocupado, tente novamente com a mesma Idempotency-Key'})
+    response.status_code = 503
+    response.headers['Retry-After'] = '1'
+    return response
+
+def admin_required(view):
+    # Token do painel em ADMIN_API_TOKEN; sem ele, só em modo debug
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        token = os.getenv('ADMIN_API_TOKEN')
+        if token:
+            sent = request.headers.get('Authorization', '').removeprefix('Bearer ')
+            if not hmac.compare_digest(sent, token):
+                return jsonify({'error': 'Não autorizado'}), 401
+        elif not app.debug:
+            return jsonify({'error': 'ADMIN_API_TOKEN não configurado'}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+def session_user_id():
+    # Aluno gravado no cookie assinado pelo /api/login; o cliente não consegue forjá-lo
+    return session.get('user_id')
+
+def parse_period():
+    """Lê ?from=&to= (YYYY-MM-DD); padrão: últimos 30 dias (UTC, como created_at)."""
+    end = date.fromisoformat(request.args['to']) if request.args.get('to') else datetime.utcnow().date()
+    start = date.fromisoformat(request.args['from']) if request.args.get('from') else end - timedelta(days=29)
+    return start, end
+
+@app.route('/metrics', methods=['GET'])
+def metrics_endpoint():
+    # Com METRICS_TOKEN definido, o Prometheus precisa enviá-lo como Bearer
+    token = os.getenv('METRICS_TOKEN')
+    if token:
+        sent = request.headers.get('Authorization', '').removeprefix('Bearer ')
+        if not hmac.compare_digest(sent, token):
+            return jsonify({'error': 'Não autorizado'}), 401
+    return metrics.response()
+
 @app.route('/api/register', methods=['POST'])
+@register_guard
 def register():
     data = request.json
     if not data or not data.get('email') or not data.get('password'):
@@ -41,7 +308,8 @@ def register():
     if User.query.filter_by(email=data['email']).first():
         return jsonify({'error': 'Email já cadastrado'}), 400
     
-    hashed_password = generate_password_hash(data['password'])
+    with metrics.phase('password_hash'):
+        hashed_password = hasher.hash(data['password'])
     new_user = User(
         name=data.get('name', ''),
         email=data['email'],
@@ -53,13 +321,29 @@ def register():
     return jsonify({'message': 'Usuário criado com sucesso!', 'user': new_user.to_dict()}), 201
 
 @app.route('/api/login', methods=['POST'])
+@login_guard
 def login():
     data = request.json
     user = User.query.filter_by(email=data.get('email')).first()
-    if user and check_password_hash(user.password_hash, data.get('password')):
-        return jsonify({'message': 'Login realizado com sucesso', 'user': user.to_dict()})
+    if user and data.get('password'):
+        with metrics.phase('password_hash'):
+            ok, new_hash = hasher.verify(user.password_hash, data['password'])
+        if ok:
+            if new_hash:
+                # Hash com custo antigo: atualiza de forma transparente no login
+                user.password_hash = new_hash
+                db.session.commit()
+            session.clear()
+            session['user_id'] = user.id
+            session.permanent = True
+            return jsonify({'message': 'Login realizado com sucesso', 'user': user.to_dict()})
     return jsonify({'error': 'Credenciais inválidas'}), 401
 
+@app.route('/api/logout', methods=['POST'])
+def logout():
+    session.clear()
+    return jsonify({'message': 'Sessão encerrada'})
+
 @app.route('/api/checkout', methods=['POST'])
 def checkout():
     data = request.json
@@ -67,28 +351,362 @@ def checkout():
     if not user_id:
         return jsonify({'error': 'Usuário não identificado'}), 400
 
-    new_order = Order(
-        user_id=user_id,
-        course_id=data.get('course_id'),
-        total_amount=data.get('amount'),
-        payment_method=data.get('payment_method', 'credit_card'),
-        status='paid'
+    idempotency_key = request.headers.get('Idempotency-Key')
+    if idempotency_key is not None and not 0 < len(idempotency_key) <= 64:
+        return jsonify({'error': 'Idempotency-Key inválida'}), 400
+
+    # O preço vem do cadastro do curso; o valor enviado pelo cliente é ignorado
+    course = db.session.get(Course, data.get('course_id')) if isinstance(data.get('course_id'), str) else None
+    if course is None:
+        return jsonify({'error': 'Curso não encontrado'}), 404
+
+    # Só o webhook do gateway marca o pedido como pago (ver webhooks.py)
+    fields = {
+        'user_id': user_id,
+        'course_id': course.id,
+        'total_amount': course.price,
+        'payment_method': data.get('payment_method', 'credit_card'),
+        'status': 'pending'
+    }
+    payment = None
+    try:
+        if gateway is None:
+            order, created = order_writer.submit(fields, idempotency_key=idempotency_key)
+        else:
+            user = db.session.get(User, user_id)
+            if user is None:
+                return jsonify({'error': 'Usuário não encontrado'}), 404
+            order, created, payment = start_checkout(
+                gateway, user,
+                lambda: order_writer.submit(fields, idempotency_key=idempotency_key),
+                fields['payment_method'], cpf=data.get('cpf'))
+    except IdempotencyConflict:
+        return jsonify({'error': 'Idempotency-Key já usada em outra compra'}), 422
+    except GatewayError:
+        app.logger.exception('Falha no gateway de pagamento')
+        # O pedido fica pendente; repetir com a mesma Idempotency-Key retoma a cobrança
+        return jsonify({'error': 'Falha ao processar pagamento, tente novamente'}), 502
+
+    if payment is None:
+        # Sem gateway configurado o pedido fica pendente até a confirmação manual
+        response = jsonify({'message': 'Pedido criado, aguardando pagamento', 'order': order})
+    else:
+        response = jsonify({'message': 'Pedido criado, aguardando pagamento', 'order': order, **payment})
+    response.status_code = 201
+    if not created:
+        # Repetição do mesmo checkout: devolve o pedido original
+        response.headers['Idempotent-Replayed'] = 'true'
+    return response
+
+@app.route('/api/webhooks/payment', methods=['POST'])
+def payment_webhook():
+    # Token definido no painel do Asaas, enviado no header asaas-access-token
+    token = os.getenv('ASAAS_WEBHOOK_TOKEN')
+    if token:
+        if not hmac.compare_digest(request.headers.get('asaas-access-token', ''), token):
+            return jsonify({'error': 'Não autorizado'}), 401
+    elif not app.debug:
+        return jsonify({'error': 'ASAAS_WEBHOOK_TOKEN não configurado'}), 403
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify({'error': 'JSON inválido'}), 400
+    try:
+        if record_event(payload):
+            payment_events.notify()
+    except InvalidEvent:
+        return jsonify({'error': 'Evento sem tipo ou pagamento'}), 400
+    # Responde assim que o evento está gravado; o pedido é atualizado depois
+    return jsonify({'received': True})
+
+@app.route('/api/progress', methods=['POST'])
+def record_progress():
+    user_id = session_user_id()
+    if user_id is None:
+        return jsonify({'error': 'Faça login para continuar'}), 401
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'JSON inválido'}), 400
+    course_id = data.get('course_id')
+    lesson_id = data.get('lesson_id')
+    position = data.get('position')
+    duration = data.get('duration')
+    if not isinstance(lesson_id, str) or not 0 < len(lesson_id) <= 100:
+        return jsonify({'error': 'Aula inválida'}), 400
+    if not isinstance(position, (int, float)) or isinstance(position, bool) or position < 0:
+        return jsonify({'error': 'Posição inválida'}), 400
+    if duration is not None and (not isinstance(duration, (int, float)) or isinstance(duration, bool) or duration <= 0):
+        return jsonify({'error': 'Duração inválida'}), 400
+    if not isinstance(course_id, str) or catalog.get_item(course_id) is None:
+        return jsonify({'error': 'Curso não encontrado'}), 404
+
+    row = progress_buffer.record(user_id, course_id, lesson_id, float(position),
+                                 float(duration) if duration is not None else None)
+    # Aceito em memória; vai ao banco no próximo flush
+    return jsonify({'accepted': True, 'completed': row['completed']}), 202
+
+@app.route('/api/progress', methods=['GET'])
+def get_progress():
+    user_id = session_user_id()
+    if user_id is None:
+        return jsonify({'error': 'Faça login para continuar'}), 401
+    course_id = request.args.get('course_id')
+    if not course_id:
+        return jsonify({'error': 'Informe course_id'}), 400
+    lessons = {row.lesson_id: row.to_dict()
+               for row in LessonProgress.query.filter_by(user_id=user_id, course_id=course_id)}
+    # Heartbeats ainda no buffer deste processo são mais novos que o banco
+    for lesson_id, row in progress_buffer.pending(user_id, course_id).items():
+        stored = lessons.get(lesson_id)
+        lessons[lesson_id] = {
+            'course_id': course_id,
+            'lesson_id': lesson_id,
+            'position': row['position_seconds'],
+            'duration': row['duration_seconds'] or (stored and stored['duration']),
+            'completed': row['completed'] or bool(stored and stored['completed']),
+            'updated_at': row['updated_at'].isoformat()
+        }
+    return jsonify({'success': True, 'data': sorted(lessons.values(), key=lambda item: item['lesson_id'])})
+
+@app.route('/api/me/entitlements', methods=['GET'])
+def my_entitlements():
+    # Cursos liberados (pagos e incluídos em combos), consultados a cada página protegida
+    user_id = session_user_id()
+    if user_id is None:
+        return jsonify({'error': 'Faça login para continuar'}), 401
+    response = jsonify({'success': True, 'data': {'user_id': user_id,
+                                                  'courses': sorted(entitlements.get(user_id))}})
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+@app.route('/api/library/<path:material>', methods=['GET'])
+def library_material(material):
+    # Sessão e acesso ao curso antes de olhar o disco: quem não é aluno do
+    # curso não descobre quais materiais existem
+    user_id = session_user_id()
+    if user_id is None:
+        return jsonify({'error': 'Faça login para continuar'}), 401
+    if not has_access(user_id, material.partition('/')[0]):
+        return jsonify({'error': 'Material disponível só para alunos do curso'}), 403
+    found = library.lookup(material)
+    if found is None:
+        return jsonify({'error': 'Material não encontrado'}), 404
+    path, entry = found
+    return library.serve(path, entry, download=request.args.get('download') == '1')
+
+@app.route('/api/slots', methods=['GET'])
+def list_slots():
+    try:
+        first_day = date.fromisoformat(request.args['from']) if request.args.get('from') else date.today()
+        last_day = date.fromisoformat(request.args['to']) if request.args.get('to') else first_day + timedelta(days=13)
+    except ValueError:
+        return jsonify({'error': 'Datas devem estar no formato AAAA-MM-DD'}), 400
+    if first_day > last_day or (last_day - first_day).days > 62:
+        return jsonify({'error': 'Período inválido (máximo de 63 dias)'}), 400
+    return jsonify({'success': True, 'data': slot_engine.free_slots(first_day, last_day)})
+
+@app.route('/api/bookings', methods=['POST'])
+def create_booking():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data.get('name') or not data.get('email') or not data.get('start'):
+        return jsonify({'error': 'Nome, email e horário são obrigatórios'}), 400
+    try:
+        starts_at = datetime.fromisoformat(data['start'])
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Horário inválido'}), 400
+    if starts_at.tzinfo is not None:
+        return jsonify({'error': 'Envie o horário local da agenda, sem fuso'}), 400
+    try:
+        booking = slot_engine.book(
+            starts_at,
+            user_id=data.get('user_id'),
+            name=data['name'],
+            email=data['email'],
+            phone=data.get('phone', ''),
+            message=data.get('message')
+        )
+    except InvalidSlot:
+        return jsonify({'error': 'Horário fora da agenda'}), 400
+    except SlotTaken:
+        return jsonify({'error': 'Horário já reservado, escolha outro'}), 409
+    return jsonify({'message': 'Agendamento confirmado!', 'booking': booking.to_dict()}), 201
+
+@app.route('/api/bookings/<int:booking_id>/cancel', methods=['POST'])
+def cancel_booking(booking_id):
+    # Sem login no agendamento: quem cancela confirma o email da reserva
+    data = request.get_json(silent=True) or {}
+    booking = db.session.get(Booking, booking_id)
+    if booking is None or not hmac.compare_digest(str(data.get('email', '')).lower(), booking.email.lower()):
+        return jsonify({'error': 'Agendamento não encontrado'}), 404
+    slot_engine.cancel(booking)
+    return jsonify({'message': 'Agendamento cancelado', 'booking': booking.to_dict()})
+
+@app.route('/api/admin/availability', methods=['GET'])
+@admin_required
+def get_availability():
+    windows = Availability.query.order_by(Availability.weekday, Availability.start_time)
+    return jsonify({'success': True, 'data': [window.to_dict() for window in windows]})
+
+@app.route('/api/admin/availability', methods=['PUT'])
+@admin_required
+def replace_availability():
+    # Substitui todas as janelas semanais: [{weekday, start: "09:00", end: "12:00", slot_minutes}]
+    data = request.get_json(silent=True)
+    if not isinstance(data, list):
+        return jsonify({'error': 'Envie a lista de janelas'}), 400
+    try:
+        windows = [(int(item['weekday']), datetime.strptime(item['start'], '%H:%M').time(),
+                    datetime.strptime(item['end'], '%H:%M').time(), int(item.get('slot_minutes', 60)))
+                   for item in data]
+    except (KeyError, TypeError, ValueError):
+        return jsonify({'error': 'Janela inválida: use weekday, start e end no formato HH:MM'}), 400
+    errors = validate_windows(windows)
+    if errors:
+        return jsonify({'error': 'Janelas inválidas', 'details': errors}), 400
+    try:
+        slot_engine.replace_windows(windows)
+    except BookingConflict as conflict:
+        return jsonify({'error': 'Há reservas confirmadas fora das novas janelas; cancele-as antes',
+                        'bookings': [booking.to_dict() for booking in conflict.bookings]}), 409
+    return get_availability()
+
+def catalog_response(entry):
+    body, etag = entry
+    # Revalidação barata: nada é serializado nem consultado quando o ETag bate.
+    # If-None-Match compara de forma fraca: W/"etag" de um proxy também vale
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    else:
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response
+
+@app.route('/api/courses', methods=['GET'])
+def list_courses():
+    return catalog_response(catalog.get_list())
+
+@app.route('/api/courses/search', methods=['GET'])
+def course_search():
+    response = jsonify({'success': True, 'data': search_courses(request.args.get('q', ''))})
+    response.cache_control.public = True
+    response.cache_control.max_age = 60
+    return response
+
+@app.route('/api/courses/suggest', methods=['GET'])
+def course_suggest():
+    response = jsonify({'success': True, 'data': suggest_courses(request.args.get('q', ''))})
+    response.cache_control.public = True
+    response.cache_control.max_age = 60
+    return response
+
+@app.route('/api/courses/<course_id>', methods=['GET'])
+def get_course(course_id):
+    entry = catalog.get_item(course_id)
+    if entry is None:
+        return jsonify({'success': False, 'error': 'Curso não encontrado'}), 404
+    return catalog_response(entry)
+
+@app.route('/api/admin/stats', methods=['GET'])
+@admin_required
+def admin_stats():
+    try:
+        start, end = parse_period()
+    except ValueError:
+        return jsonify({'error': 'Datas devem estar no formato AAAA-MM-DD'}), 400
+    if start > end:
+        return jsonify({'error': 'Período inválido'}), 400
+    return jsonify(dashboard_stats(start, end))
+
+@app.route('/api/admin/students', methods=['GET'])
+@admin_required
+def admin_students():
+    try:
+        page = list_students(
+            cursor=request.args.get('cursor'),
+            limit=request.args.get('limit', DEFAULT_LIMIT, type=int),
+            search=request.args.get('q')
+        )
+    except InvalidCursor:
+        return jsonify({'error': 'Cursor inválido'}), 400
+    return json_response(page)
+
+@app.route('/api/admin/orders', methods=['GET'])
+@admin_required
+def admin_orders():
+    # Lista completa do período (padrão: 30 dias), escrita em streaming
+    try:
+        start, end = parse_period()
+    except ValueError:
+        return jsonify({'error': 'Datas devem estar no formato AAAA-MM-DD'}), 400
+    stmt = (
+        ADMIN_ORDER.select()
+        .join(User, User.id == Order.user_id)
+        .outerjoin(Course, Course.id == Order.course_id)
+        .where(Order.created_at >= datetime.combine(start, datetime.min.time()),
+               Order.created_at < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+        .order_by(Order.id)
     )
-    db.session.add(new_order)
-    db.session.commit()
-    return jsonify({'message': 'Compra realizada com sucesso!', 'order': new_order.to_dict()}), 201
+    if request.args.get('status'):
+        stmt = stmt.where(Order.status == request.args['status'])
+    rows = ADMIN_ORDER.iter(stmt)
+    return Response(stream_with_context(stream_array(rows, prefix=b'{"success":true,"data":', suffix=b'}')),
+                    mimetype='application/json')
+
+@app.route('/api/admin/export/<any(orders, students):dataset>.<any(csv, ndjson):fmt>', methods=['GET'])
+@admin_required
+def admin_export(dataset, fmt):
+    # Sem from/to exporta tudo
+    try:
+        start = date.fromisoformat(request.args['from']) if request.args.get('from') else None
+        end = date.fromisoformat(request.args['to']) if request.args.get('to') else None
+    except ValueError:
+        return jsonify({'error': 'Datas devem estar no formato AAAA-MM-DD'}), 400
+
+    response = Response(stream_with_context(export(dataset, fmt, start, end)), mimetype=MIMETYPES[fmt])
+    filename = f"{dataset}-{datetime.utcnow().strftime('%Y%m%d')}.{fmt}"
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@app.route('/api/admin/import/students', methods=['POST'])
+@admin_required
+@import_guard
+def admin_import_students():
+    upload = request.files.get('file')
+    if upload is None:
+        return jsonify({'error': 'Envie o CSV no campo "file"'}), 400
+    lines = io.TextIOWrapper(upload.stream, encoding='utf-8-sig')
+    report = import_students(lines, import_hasher)
+    return jsonify({**report.to_dict(), 'error_rows': report.errors})
 
 # --- Rotas Frontend ---
+def render_page(name):
+    # Em debug as páginas são sempre renderizadas na hora
+    if app.debug:
+        try:
+            return render_template(name)
+        except TemplateNotFound:
+            abort(404)
+    response = page_store.serve(name)
+    if response is not None:
+        return response
+    if not page_store.manifest:
+        # Deploy sem `flask build-pages`: melhor avisar do que renderizar em produção
+        abort(503, description='Páginas não geradas: rode flask build-pages')
+    abort(404)
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_page('index.html')
 
 @app.route('/<page>')
 def serve_page(page):
     # Proteção simples de diretório e renderização segura
     if page.endswith('.html'):
-        return render_template(page)
-    return render_template('index.html') # Fallback
+        return render_page(page)
+    return render_page('index.html') # Fallback
 
 if __name__ == '__main__':
     app.run(debug=True, port=5000)
@@ -0,0 +1,117 @@
+"""
+Bundles de JS/CSS com hash do conteúdo no nome.
+
+As páginas carregam vários scripts de static/js e o styles.css, cada um numa
+requisição e sem cache-busting. Aqui cada sequência contígua de <script> locais
+de uma página vira um único bundle minificado, e cada folha de estilo local
+ganha uma cópia minificada; todos com o hash no nome, para poderem ser
+cacheados por um ano. Bundles com o mesmo conteúdo são compartilhados entre
+páginas.
+"""
+
+import hashlib
+import json
+import os
+import re
+
+try:
+    import rjsmin
+except ImportError:  # sem minificador o bundle é só concatenado
+    rjsmin = None
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+MAX_AGE = 365 * 24 * 3600
+
+# Sequência de <script src="static/js/..."></script> separados só por espaço
+SCRIPT_RUN = re.compile(r'''(?:<script\b[^>]*\bsrc=["']/?static/js/[^"']+["'][^>]*>\s*</script>\s*)+''')
+SCRIPT_TAG = re.compile(r'''<script\b([^>]*)>\s*</script>''')
+SRC_ATTR = re.compile(r'''\s*\bsrc=["']/?(static/js/[^"']+)["']''')
+STYLESHEET = re.compile(r'''<link\s+rel=["']stylesheet["']\s+href=["']/?(static/css/[^"']+)["']\s*/?>''')
+
+
+class AssetBundler:
+    def __init__(self, root_dir, static_folder):
+        self.root_dir = root_dir
+        self.static_folder = static_folder
+        self.output_dir = os.path.join(static_folder, DIST_DIR)
+        self.manifest = {'pages': {}, 'bundles': {}}
+
+    def rewrite(self, page, html):
+        """Troca os scripts e estilos locais da página pelos bundles."""
+        urls = []
+
+        def replace_run(match):
+            run = match.group(0)
+            tags = []
+            for tag in SCRIPT_TAG.finditer(run):
+                src = SRC_ATTR.search(tag.group(1)).group(1)
+                # Atributos além do src (defer, async...) definem a ordem de
+                # execução, então só junta tags com os mesmos atributos
+                tags.append((SRC_ATTR.sub('', tag.group(1)).strip(), src))
+            groups = []
+            for attrs, src in tags:
+                if groups and groups[-1][0] == attrs:
+                    groups[-1][1].append(src)
+                else:
+                    groups.append((attrs, [src]))
+            html_tags = []
+            for attrs, sources in groups:
+                url = self._bundle(sources, 'js')
+                urls.append(url)
+                html_tags.append(f'<script src="{url}"{" " + attrs if attrs else ""}></script>')
+            trailing = run[len(run.rstrip()):]
+            return '\n    '.join(html_tags) + trailing
+
+        def replace_stylesheet(match):
+            url = self._bundle([match.group(1)], 'css')
+            urls.append(url)
+            return f'<link rel="stylesheet" href="{url}">'
+
+        html = SCRIPT_RUN.sub(replace_run, html)
+        html = STYLESHEET.sub(replace_stylesheet, html)
+        self.manifest['pages'][page] = urls
+        return html
+
+    def _bundle(self, sources, kind):
+        parts = []
+        for src in sources:
+            with open(os.path.join(self.root_dir, src), encoding='utf-8') as f:
+                parts.append(f.read())
+        if kind == 'js':
+            # ';' evita que um arquivo sem ponto e vírgula final quebre o próximo
+            content = ';\n'.join(rjsmin.jsmin(p) if rjsmin else p for p in parts)
+        else:
+            content = '\n'.join(rcssmin.cssmin(p) if rcssmin else p for p in parts)
+        data = content.encode('utf-8')
+        digest = hashlib.sha256(data).hexdigest()[:16]
+
+        stem = os.path.splitext(os.path.basename(sources[0]))[0] if len(sources) == 1 else 'bundle'
+        filename = f'{stem}.{digest}.{kind}'
+        url = f'/static/{DIST_DIR}/{filename}'
+        self.manifest['bundles'][url] = sources
+
+        path = os.path.join(self.output_dir, filename)
+        if not os.path.exists(path):
+            os.makedirs(self.output_dir, exist_ok=True)
+            with open(path + '.tmp', 'wb') as f:
+                f.write(data)
+            os.replace(path + '.tmp', path)
+        return url
+
+    def write_manifest(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2)
+
+
+def send_file_max_age(filename):
+    """Arquivos de static/dist têm hash no nome e podem ficar em cache por um ano."""
+    if filename.replace('\\', '/').startswith(DIST_DIR + '/'):
+        return MAX_AGE
+    return None
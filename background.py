@@ -0,0 +1,33 @@
+"""
+Thread de fundo por processo, iniciada no primeiro uso.
+
+O gravador de pedidos, o buffer de progresso e a outbox de pagamentos têm cada
+um uma thread daemon que só deve existir depois do fork dos workers (serve.py
+importa o app no processo pai). A thread não sobrevive a um fork, então
+ensure_started() confere o pid: num processo novo, on_fork() descarta o estado
+herdado do pai (filas, eventos) e a thread é criada de novo.
+"""
+
+import os
+import threading
+
+
+class BackgroundThread:
+    def __init__(self, name, target, on_fork=None):
+        self.name = name
+        self.target = target
+        self.on_fork = on_fork
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def ensure_started(self):
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                if self.on_fork is not None:
+                    self.on_fork()
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self.target, name=self.name, daemon=True)
+                self._thread.start()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark de checkout de ponta a ponta contra o gateway local.
+
+Primeira compra (cliente ainda não salvo no User) e recompra (cliente em
+cache) de N alunos, com concorrência configurável. Mostra a latência e quantas
+requisições e conexões o gateway recebeu por checkout.
+
+    python benchmarks/bench_checkout.py --students 100 --concurrency 8 --latency 40
+"""
+
+import argparse
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from common import use_temp_database, summarize, print_summary, Timer
+from gateway_server import start_server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--students', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=40, help='ms por requisição ao gateway')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='fração de respostas 503 do gateway')
+    parser.add_argument('--method', default='pix', choices=['pix', 'credit_card'])
+    args = parser.parse_args()
+
+    server, url = start_server(latency=args.latency / 1000, failure_rate=args.failure_rate)
+    os.environ['ASAAS_API_URL'] = url
+    os.environ['ASAAS_API_KEY'] = 'bench'
+    use_temp_database()
+    import app as app_module
+    from database import create_schema, seed_courses
+    from models import db, User
+
+    app = app_module.app
+    with app.app_context():
+        create_schema()
+        seed_courses()
+        users = [User(name=f'Aluno {i}', email=f'checkout{i}@agape.test', password_hash='-')
+                 for i in range(args.students)]
+        db.session.add_all(users)
+        db.session.commit()
+        user_ids = [user.id for user in users]
+
+    def one_checkout(user_id):
+        client = app.test_client()
+        with Timer() as t:
+            response = client.post('/api/checkout', headers={'Idempotency-Key': uuid.uuid4().hex}, json={
+                'user_id': user_id, 'course_id': 'combo', 'amount': 497.0, 'payment_method': args.method})
+        assert response.status_code == 201, (response.status_code, response.json)
+        return t.elapsed
+
+    print(f"{args.students} alunos, concorrência {args.concurrency}, gateway com {args.latency:.0f}ms")
+    state = server.state
+    for label in ('primeira compra', 'recompra (cliente em cache)'):
+        requests_before, connections_before = state.requests, state.connections
+        with Timer() as total:
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                latencies = list(pool.map(one_checkout, user_ids))
+        print_summary(label, summarize(latencies, total.elapsed))
+        print(f"  {(state.requests - requests_before) / args.students:.2f} requisições e "
+              f"{state.connections - connections_before} conexões novas no gateway")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
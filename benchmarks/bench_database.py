@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Benchmark de leituras/escritas concorrentes sobre User/Order por perfil de engine.
+
+Cada thread sorteia entre uma leitura (usuário por email + pedidos dele) e uma
+escrita (novo pedido com commit próprio), na proporção de --write-ratio.
+
+    python benchmarks/bench_database.py --profiles sqlite-legacy sqlite-wal
+    python benchmarks/bench_database.py --database-url postgresql://... --profiles postgres postgres-small
+
+Com --database-url o banco precisa estar vazio: as tabelas são recriadas a
+cada perfil. Para apagar as que já existem, passe --drop.
+"""
+
+import argparse
+import random
+import threading
+import time
+
+from common import use_temp_database, summarize, print_summary
+
+from flask import Flask
+from sqlalchemy import inspect
+
+
+def build_app(database_url, profile):
+    from database import init_database
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    init_database(app, database_url, profile)
+    return app
+
+
+def seed(app, users, drop=False):
+    from models import db, User, Course
+    with app.app_context():
+        existing = inspect(db.engine).get_table_names()
+        if existing and not drop:
+            raise SystemExit(f"O banco já tem tabelas ({', '.join(sorted(existing))}): "
+                             f"use um banco vazio ou --drop para apagá-las")
+        db.drop_all()
+        db.create_all()
+        db.session.add(Course(id='combo', name='Combo', price=497.0))
+        db.session.execute(User.__table__.insert(), [
+            {'name': f'Aluno {i}', 'email': f'aluno{i}@agape.test', 'password_hash': 'x'}
+            for i in range(1, users + 1)
+        ])
+        db.session.commit()
+
+
+def run_mix(app, threads, duration, write_ratio, users):
+    from models import db, User, Order
+    reads, writes, errors = [], [], []
+    deadline = time.monotonic() + duration
+
+    def worker(seed_value):
+        rng = random.Random(seed_value)
+        with app.app_context():
+            while time.monotonic() < deadline:
+                user_id = rng.randint(1, users)
+                start = time.perf_counter()
+                try:
+                    if rng.random() < write_ratio:
+                        db.session.add(Order(user_id=user_id, course_id='combo', total_amount=497.0,
+                                             payment_method='pix', status='paid'))
+                        db.session.commit()
+                        writes.append(time.perf_counter() - start)
+                    else:
+                        user = User.query.filter_by(email=f'aluno{user_id}@agape.test').first()
+                        [o.to_dict() for o in user.orders]
+                        db.session.commit()
+                        reads.append(time.perf_counter() - start)
+                except Exception as error:
+                    db.session.rollback()
+                    errors.append(type(error).__name__)
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    return summarize(reads, duration), summarize(writes, duration), errors
+
+
+def main():
+    from models import db
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', nargs='+', default=['sqlite-legacy', 'sqlite-wal'])
+    parser.add_argument('--database-url', help='padrão: SQLite temporário por perfil')
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=5.0)
+    parser.add_argument('--write-ratio', type=float, default=0.2)
+    parser.add_argument('--users', type=int, default=5000)
+    parser.add_argument('--drop', action='store_true', help='apaga as tabelas já existentes em --database-url')
+    args = parser.parse_args()
+
+    print(f"{args.threads} threads, {args.duration:.0f}s, {args.write_ratio:.0%} escritas")
+    drop = args.drop
+    for profile in args.profiles:
+        database_url = use_temp_database(args.database_url)
+        app = build_app(database_url, profile)
+        seed(app, args.users, drop)
+        # Daqui em diante as tabelas do banco informado são as do próprio benchmark
+        drop = True
+        read_stats, write_stats, errors = run_mix(app, args.threads, args.duration, args.write_ratio, args.users)
+        print(f"[{profile}]")
+        print_summary('  leitura', read_stats)
+        print_summary('  escrita', write_stats)
+        if errors:
+            print(f"  erros: {len(errors)} ({', '.join(sorted(set(errors)))})")
+        with app.app_context():
+            # Libera o banco para o próximo perfil (que pode trocar o journal_mode)
+            db.engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
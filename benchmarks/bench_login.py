@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Benchmark de login concorrente: hash inline vs pool de processos.
+
+Dispara N logins simultâneos e, em paralelo, requisições leves ao catálogo,
+para mostrar quanto o hash inline atrasa o resto do worker.
+
+    python benchmarks/bench_login.py --concurrency 16 --logins 128
+"""
+
+import argparse
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from common import use_temp_database, summarize, print_summary, Timer
+
+PASSWORD = 'senha-de-benchmark'
+
+
+def run_round(app_module, concurrency, logins, emails):
+    app = app_module.app
+    stop = threading.Event()
+    side_latencies = []
+
+    def side_traffic():
+        client = app.test_client()
+        while not stop.is_set():
+            with Timer() as t:
+                client.get('/api/courses')
+            side_latencies.append(t.elapsed)
+
+    def one_login(i):
+        client = app.test_client()
+        with Timer() as t:
+            response = client.post('/api/login', json={'email': emails[i % len(emails)], 'password': PASSWORD})
+        assert response.status_code == 200, response.status_code
+        return t.elapsed
+
+    side = threading.Thread(target=side_traffic)
+    side.start()
+    try:
+        with Timer() as total:
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                latencies = list(pool.map(one_login, range(logins)))
+    finally:
+        # Um login que falha não pode deixar o tráfego paralelo rodando para sempre
+        stop.set()
+        side.join()
+    return summarize(latencies, total.elapsed), summarize(side_latencies, total.elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--logins', type=int, default=128)
+    parser.add_argument('--method', default='scrypt')
+    parser.add_argument('--workers', type=int, default=None, help='processos do pool (padrão: núcleos)')
+    args = parser.parse_args()
+
+    use_temp_database()
+    # Todos os logins saem do mesmo IP
+    os.environ.setdefault('LOGIN_RATE_IP', '0')
+    os.environ.setdefault('LOGIN_RATE_EMAIL', '0')
+    # Todos os logins chegam ao hash: mede o hash, não a recusa da admissão
+    os.environ.setdefault('LOGIN_CONCURRENCY', str(args.concurrency))
+    os.environ.setdefault('LOGIN_QUEUE', str(args.concurrency))
+    os.environ.setdefault('LOGIN_QUEUE_TIMEOUT', '600')
+    import app as app_module
+    from hashing import PasswordHasher
+    from models import db, User
+
+    inline = PasswordHasher(method=args.method, workers=0)
+    pooled = PasswordHasher(method=args.method, workers=args.workers, max_pending=args.concurrency * 2)
+
+    with app_module.app.app_context():
+        db.create_all()
+        password_hash = inline.hash(PASSWORD)
+        emails = [f'bench{i}@agape.test' for i in range(args.concurrency)]
+        db.session.add_all(User(name='Bench', email=e, password_hash=password_hash) for e in emails)
+        db.session.commit()
+
+    print(f"{args.logins} logins, concorrência {args.concurrency}, método {args.method}")
+    for label, hasher in (('inline (antes)', inline), (f'pool {pooled.workers} proc (depois)', pooled)):
+        app_module.hasher = hasher
+        hasher.hash('aquecimento')
+        login_stats, side_stats = run_round(app_module, args.concurrency, args.logins, emails)
+        print_summary(f'login {label}', login_stats)
+        print_summary(f'  /api/courses durante', side_stats)
+    pooled.shutdown()
+
+
+if __name__ == '__main__':
+    main()
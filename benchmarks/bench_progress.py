@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Benchmark dos heartbeats de progresso: requisições aceitas x transações no banco.
+
+Simula N alunos assistindo ao mesmo tempo, cada um enviando a posição da aula
+a cada --interval segundos (comprimido no tempo: todos os heartbeats de uma
+"rodada" saem de uma vez). Mostra a latência do POST /api/progress e quantos
+flushes e linhas chegaram ao banco.
+
+    python benchmarks/bench_progress.py --viewers 2000 --rounds 10 --concurrency 16
+"""
+
+import argparse
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+from common import use_temp_database, summarize, print_summary, Timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--viewers', type=int, default=2000)
+    parser.add_argument('--rounds', type=int, default=10, help='heartbeats por aluno')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--flush-interval', type=float, default=2.0)
+    args = parser.parse_args()
+
+    use_temp_database()
+    os.environ['PROGRESS_FLUSH_INTERVAL'] = str(args.flush_interval)
+    import app as app_module
+    from database import create_schema, seed_courses
+    from models import db, User, LessonProgress
+
+    app = app_module.app
+    with app.app_context():
+        create_schema()
+        seed_courses()
+        db.session.execute(User.__table__.insert(), [
+            {'name': f'Aluno {i}', 'email': f'progresso{i}@agape.test', 'password_hash': '-'}
+            for i in range(args.viewers)])
+        db.session.commit()
+
+    buffer = app_module.progress_buffer
+    lessons = [f'aula-{n}' for n in range(1, 21)]
+    watching = {user_id: random.choice(lessons) for user_id in range(1, args.viewers + 1)}
+
+    def heartbeat(item):
+        user_id, position = item
+        client = app.test_client()
+        with client.session_transaction() as session:
+            session['user_id'] = user_id
+        with Timer() as t:
+            response = client.post('/api/progress', json={
+                'course_id': 'combo', 'lesson_id': watching[user_id],
+                'position': position, 'duration': 600})
+        assert response.status_code == 202, (response.status_code, response.json)
+        return t.elapsed
+
+    work = [(user_id, round_index * 10) for round_index in range(args.rounds) for user_id in watching]
+    print(f"{args.viewers} alunos x {args.rounds} heartbeats, concorrência {args.concurrency}, "
+          f"flush a cada {args.flush_interval:g}s")
+    with Timer() as total:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            latencies = list(pool.map(heartbeat, work))
+        app_module.shutdown()
+    print_summary('POST /api/progress', summarize(latencies, total.elapsed))
+
+    flushes = sum(value for _, value in buffer.flushes.samples())
+    rows = sum(value for _, value in buffer.rows_written.samples())
+    with app.app_context():
+        stored = LessonProgress.query.count()
+    print(f"  {len(work)} heartbeats -> {flushes} transações, {rows} linhas gravadas, {stored} no banco "
+          f"({len(work) / max(1, flushes):.0f} heartbeats por transação, "
+          f"{flushes / total.elapsed:.1f} transações/s)")
+
+
+if __name__ == '__main__':
+    random.seed(1)
+    main()
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: entidades do ORM + to_dict + jsonify x projeções + JSON rápido.
+
+Popula N pedidos e serializa a mesma lista de três formas:
+
+- orm: Order.query.all(), to_dict() e jsonify (o caminho antigo);
+- projeção: só as colunas da resposta, em dicts simples, com dumps();
+- streaming: a projeção em lotes com stream_array.
+
+    python benchmarks/bench_projections.py --rows 10000 --repeat 20
+"""
+
+import argparse
+import json
+import random
+from datetime import datetime, timedelta
+
+from common import use_temp_database, summarize, print_summary, Timer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    use_temp_database()
+    import app as app_module
+    from flask import jsonify
+    from database import create_schema, seed_courses
+    from models import db, User, Order
+    from projections import ORDER, dumps, orjson, stream_array
+
+    app = app_module.app
+    rng = random.Random(1)
+    start = datetime(2024, 1, 1)
+    with app.app_context():
+        create_schema()
+        seed_courses()
+        db.session.execute(User.__table__.insert(), [
+            {'name': 'Aluno', 'email': 'projecoes@agape.test', 'password_hash': '-'}])
+        db.session.execute(Order.__table__.insert(), [
+            {'user_id': 1, 'course_id': rng.choice(['combo', 'massagem', 'terapia-capilar']),
+             'status': rng.choice(['paid', 'pending']), 'total_amount': 297.0, 'payment_method': 'pix',
+             'created_at': start + timedelta(minutes=i)}
+            for i in range(args.rows)])
+        db.session.commit()
+
+    def orm_path():
+        with app.test_request_context():
+            orders = [order.to_dict() for order in Order.query.order_by(Order.id).all()]
+            body = jsonify({'data': orders}).get_data()
+            db.session.remove()
+            return body
+
+    def projection_path():
+        with app.test_request_context():
+            body = dumps({'data': ORDER.all(ORDER.select().order_by(Order.id))})
+            db.session.remove()
+            return body
+
+    def streaming_path():
+        with app.test_request_context():
+            body = b''.join(stream_array(ORDER.iter(ORDER.select().order_by(Order.id)),
+                                         prefix=b'{"data":', suffix=b'}'))
+            db.session.remove()
+            return body
+
+    paths = [('orm + to_dict + jsonify', orm_path), ('projeção + dumps', projection_path),
+             ('projeção + stream_array', streaming_path)]
+    with app.app_context():
+        # Os três caminhos devolvem os mesmos dados
+        reference = json.loads(orm_path())
+        for label, path in paths[1:]:
+            assert json.loads(path()) == reference, label
+
+        print(f"{args.rows} pedidos, {args.repeat} repetições, "
+              f"JSON com {'orjson' if orjson is not None else 'json (stdlib)'}")
+        results = {}
+        for label, path in paths:
+            latencies = []
+            with Timer() as total:
+                for _ in range(args.repeat):
+                    with Timer() as t:
+                        path()
+                    latencies.append(t.elapsed)
+            results[label] = summarize(latencies, total.elapsed)
+            print_summary(label, results[label])
+        base = results[paths[0][0]]['p50']
+        for label, _ in paths[1:]:
+            print(f"  {label}: {base / results[label]['p50']:.1f}x mais rápido que o ORM (p50)")
+
+
+if __name__ == '__main__':
+    main()
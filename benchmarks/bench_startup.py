@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Tempo de inicialização de um worker: import do app + primeira requisição.
+
+Cada amostra roda num processo Python novo, contra um banco já preparado com
+`flask db-init`. Use --record para acumular o resultado de cada release:
+
+    python benchmarks/bench_startup.py --runs 10 --record benchmarks/startup_history.jsonl
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from common import ROOT_DIR, use_temp_database
+
+PROBE = '''
+import json, time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+response = app.app.test_client().get('/api/courses')
+served = time.perf_counter()
+print(json.dumps({
+    'import_ms': (imported - start) * 1000,
+    'first_request_ms': (served - imported) * 1000,
+    'status': response.status_code,
+}))
+'''
+
+
+def revision():
+    try:
+        return subprocess.check_output(['git', 'describe', '--always', '--dirty'],
+                                       cwd=ROOT_DIR, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'desconhecida'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--database-url', help='padrão: SQLite temporário')
+    parser.add_argument('--record', help='arquivo JSON Lines onde anexar o resultado')
+    args = parser.parse_args()
+
+    use_temp_database(args.database_url)
+    env = dict(os.environ)
+    subprocess.run([sys.executable, '-m', 'flask', 'db-init'], cwd=ROOT_DIR, env=env,
+                   check=True, stdout=subprocess.DEVNULL)
+
+    samples = []
+    for _ in range(args.runs):
+        output = subprocess.check_output([sys.executable, '-c', PROBE], cwd=ROOT_DIR, env=env, text=True)
+        sample = json.loads(output.strip().splitlines()[-1])
+        if sample['status'] != 200:
+            raise SystemExit(f"Primeira requisição falhou com status {sample['status']}")
+        samples.append(sample)
+
+    result = {
+        'revision': revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'runs': args.runs,
+        'import_ms': statistics.median(s['import_ms'] for s in samples),
+        'first_request_ms': statistics.median(s['first_request_ms'] for s in samples),
+    }
+    result['total_ms'] = result['import_ms'] + result['first_request_ms']
+    print(f"revisão {result['revision']}: import {result['import_ms']:.1f}ms, "
+          f"primeira requisição {result['first_request_ms']:.1f}ms, total {result['total_ms']:.1f}ms "
+          f"(mediana de {args.runs})")
+
+    if args.record:
+        with open(args.record, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(result) + '\n')
+
+
+if __name__ == '__main__':
+    main()
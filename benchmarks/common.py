@@ -0,0 +1,57 @@
+"""
+Utilitários compartilhados pelos benchmarks.
+
+Os benchmarks nunca tocam no agape.db: cada execução usa um SQLite temporário
+(ou o DATABASE_URL informado via --database-url).
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.append(ROOT_DIR)
+
+
+def use_temp_database(database_url=None):
+    """Aponta o app para um banco descartável. Deve rodar antes de importar app."""
+    if not database_url:
+        path = os.path.join(tempfile.mkdtemp(prefix='agape-bench-'), 'bench.db')
+        database_url = 'sqlite:///' + path
+    os.environ['DATABASE_URL'] = database_url
+    return database_url
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, elapsed):
+    """Resumo em ms das latências (em segundos) de uma rodada."""
+    return {
+        'count': len(latencies),
+        'throughput': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 50) * 1000,
+        'p95': percentile(latencies, 95) * 1000,
+        'p99': percentile(latencies, 99) * 1000,
+    }
+
+
+def print_summary(label, stats):
+    print(f"{label:<32} n={stats['count']:<6} {stats['throughput']:8.1f} req/s  "
+          f"p50={stats['p50']:8.2f}ms  p95={stats['p95']:8.2f}ms  p99={stats['p99']:8.2f}ms")
+
+
+class Timer:
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
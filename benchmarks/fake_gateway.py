@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Gateway falso: dispara rajadas de webhooks de pagamento contra o app.
+
+Cria pedidos pendentes num banco temporário e envia, com concorrência, os
+eventos de cada cobrança (confirmado, recebido e, para parte delas, estornado),
+cada um repetido --duplicates vezes como o Asaas faz em retentativas. Mede a
+latência do webhook, o tempo até a outbox ser aplicada e confere o status
+final de cada pedido.
+
+    python benchmarks/fake_gateway.py --payments 500 --concurrency 16
+"""
+
+import argparse
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from common import use_temp_database, summarize, print_summary, Timer
+
+
+def build_events(payments, duplicates, refund_ratio):
+    """Eventos por cobrança, na ordem em que o gateway os emite."""
+    rounds = [[], [], []]
+    expected = {}
+    for i in range(payments):
+        payment_id = f'pay_{i:06d}'
+        refunded = i < payments * refund_ratio
+        expected[payment_id] = 'refunded' if refunded else 'paid'
+        rounds[0].append(('PAYMENT_CONFIRMED', payment_id))
+        rounds[1].append(('PAYMENT_RECEIVED', payment_id))
+        if refunded:
+            rounds[2].append(('PAYMENT_REFUNDED', payment_id))
+
+    bursts = []
+    for events in rounds:
+        burst = [{'id': f'evt_{event}_{payment_id}', 'event': event, 'payment': {'id': payment_id}}
+                 for event, payment_id in events for _ in range(duplicates)]
+        random.shuffle(burst)
+        bursts.append(burst)
+    return bursts, expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--payments', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duplicates', type=int, default=2, help='vezes que cada evento é enviado')
+    parser.add_argument('--refund-ratio', type=float, default=0.1)
+    parser.add_argument('--database-url', default=None)
+    args = parser.parse_args()
+
+    use_temp_database(args.database_url)
+    import app as app_module
+    from database import create_schema, seed_courses
+    from models import db, User, Order, PaymentEvent
+
+    app = app_module.app
+    app.debug = True  # dispensa o ASAAS_WEBHOOK_TOKEN
+    with app.app_context():
+        create_schema()
+        seed_courses()
+        user = User(name='Gateway', email='gateway@agape.test', password_hash='-')
+        db.session.add(user)
+        db.session.flush()
+        db.session.execute(Order.__table__.insert(), [
+            {'user_id': user.id, 'course_id': 'combo', 'status': 'pending', 'total_amount': 497.0,
+             'payment_method': 'pix', 'payment_id': f'pay_{i:06d}'}
+            for i in range(args.payments)
+        ])
+        db.session.commit()
+
+    bursts, expected = build_events(args.payments, args.duplicates, args.refund_ratio)
+
+    def post(event):
+        client = app.test_client()
+        with Timer() as t:
+            response = client.post('/api/webhooks/payment', json=event)
+        assert response.status_code == 200, response.status_code
+        return t.elapsed
+
+    latencies = []
+    with Timer() as sending:
+        for burst in bursts:
+            with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+                latencies.extend(pool.map(post, burst))
+    with Timer() as draining, app.app_context():
+        while PaymentEvent.query.filter(PaymentEvent.processed_at.is_(None)).count():
+            db.session.rollback()
+            time.sleep(0.01)
+
+    print(f"{args.payments} cobranças, {len(latencies)} webhooks, concorrência {args.concurrency}")
+    print_summary('webhook', summarize(latencies, sending.elapsed))
+    print(f"outbox aplicada {draining.elapsed:.2f}s após o último webhook")
+
+    with app.app_context():
+        final = dict(db.session.query(Order.payment_id, Order.status))
+        stored = PaymentEvent.query.count()
+    wrong = [payment_id for payment_id, status in expected.items() if final.get(payment_id) != status]
+    print(f"{stored} eventos distintos gravados; {len(wrong)} pedidos com status incorreto")
+    if wrong:
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
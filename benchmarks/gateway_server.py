@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Gateway local que imita as rotas do Asaas usadas no checkout, para medir o
+checkout de ponta a ponta sem rede.
+
+Rotas: GET/POST /customers, GET/POST /payments, GET /payments/<id> e
+GET /payments/<id>/pixQrCode. Fala HTTP/1.1 com keep-alive, respeita o header
+Idempotency-Key e pode simular latência por requisição e falhas 503.
+
+    python benchmarks/gateway_server.py --port 8765 --latency 40
+    ASAAS_API_URL=http://127.0.0.1:8765 ASAAS_API_KEY=teste python app.py
+"""
+
+import argparse
+import itertools
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+
+class GatewayState:
+    def __init__(self, latency=0.0, failure_rate=0.0):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.customers = {}
+        self.payments = {}
+        self.idempotent = {}
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        self._ids = itertools.count(1)
+
+    def next_id(self, prefix):
+        return f'{prefix}_{next(self._ids):08d}'
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.state.lock:
+            self.server.state.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def _reply(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _handle(self, method):
+        state = self.server.state
+        length = int(self.headers.get('Content-Length') or 0)
+        body = json.loads(self.rfile.read(length)) if length else None
+        with state.lock:
+            state.requests += 1
+        if state.latency:
+            time.sleep(state.latency)
+        if not self.headers.get('access_token'):
+            return self._reply(401, {'errors': [{'code': 'invalid_access_token'}]})
+        if state.failure_rate and random.random() < state.failure_rate:
+            return self._reply(503, {'errors': [{'code': 'unavailable'}]})
+
+        key = self.headers.get('Idempotency-Key')
+        with state.lock:
+            if key and key in state.idempotent:
+                return self._reply(200, state.idempotent[key])
+            status, data = self._route(method, body)
+            if key and method == 'POST' and status == 200:
+                state.idempotent[key] = data
+        self._reply(status, data)
+
+    def _route(self, method, body):
+        state = self.server.state
+        url = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        parts = [p for p in url.path.split('/') if p]
+
+        if parts == ['customers']:
+            if method == 'GET':
+                return 200, {'data': [c for c in state.customers.values() if c['email'] == query.get('email')]}
+            customer = dict(body, id=state.next_id('cus'))
+            state.customers[customer['id']] = customer
+            return 200, customer
+
+        if parts == ['payments']:
+            if method == 'GET':
+                reference = query.get('externalReference')
+                return 200, {'data': [p for p in state.payments.values() if p['externalReference'] == reference]}
+            if body.get('customer') not in state.customers:
+                return 400, {'errors': [{'code': 'invalid_customer'}]}
+            payment_id = state.next_id('pay')
+            payment = dict(body, id=payment_id, status='PENDING',
+                           invoiceUrl=f'https://sandbox.asaas.test/i/{payment_id}')
+            state.payments[payment_id] = payment
+            return 200, payment
+
+        if len(parts) >= 2 and parts[0] == 'payments' and parts[1] in state.payments:
+            payment = state.payments[parts[1]]
+            if parts[2:] == ['pixQrCode']:
+                return 200, {'payload': f'00020126PIX{payment["id"]}', 'encodedImage': 'iVBORw0KGgo='}
+            if not parts[2:]:
+                return 200, payment
+        return 404, {'errors': [{'code': 'not_found'}]}
+
+    def do_GET(self):
+        self._handle('GET')
+
+    def do_POST(self):
+        self._handle('POST')
+
+
+def start_server(port=0, latency=0.0, failure_rate=0.0):
+    """Sobe o gateway numa thread. Retorna (server, url)."""
+    server = ThreadingHTTPServer(('127.0.0.1', port), Handler)
+    server.daemon_threads = True
+    server.state = GatewayState(latency, failure_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_address[1]}'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=40, help='ms por requisição')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='fração de respostas 503')
+    args = parser.parse_args()
+
+    server, url = start_server(args.port, args.latency / 1000, args.failure_rate)
+    print(f'Gateway local em {url}')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,234 @@
+#!/usr/bin/env python3
+"""
+Suíte de carga dos caminhos quentes do app, comparada com baselines.
+
+Sobe o app contra um banco temporário (SQLite, ou o Postgres de --database-url)
+populado com volumes realistas, dispara cada cenário com a concorrência pedida
+e mostra vazão e p50/p95/p99. Com --baseline, compara com o resultado gravado
+e sai com código 1 se algum cenário piorou além da tolerância.
+
+    # Grava a baseline (rode na mesma máquina em que a comparação vai rodar)
+    python benchmarks/suite.py --record benchmarks/baselines/sqlite.json
+
+    # Antes do deploy
+    python benchmarks/suite.py --baseline benchmarks/baselines/sqlite.json
+
+    # Rodada curta durante o desenvolvimento
+    python benchmarks/suite.py --users 10000 --orders 100000 --scenarios login checkout
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import tempfile
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from common import use_temp_database, summarize, print_summary, Timer
+
+PASSWORD = 'senha-de-benchmark'
+ADMIN_TOKEN = 'token-de-benchmark'
+SEED = 20240601
+STATUSES = [('paid', 80), ('pending', 15), ('failed', 4), ('refunded', 1)]
+PAYMENT_METHODS = ['pix', 'credit_card', 'boleto']
+CHUNK = 10000
+
+
+def seed_database(db, tables, courses, users, orders):
+    """Popula usuários e pedidos com inserts em lote. Reprodutível pelo SEED."""
+    from hashing import PasswordHasher
+    User, Order = tables
+    rng = random.Random(SEED)
+    password_hash = PasswordHasher(workers=0).hash(PASSWORD)
+    start = datetime.utcnow() - timedelta(days=730)
+
+    for offset in range(0, users, CHUNK):
+        db.session.execute(User.__table__.insert(), [
+            {'name': f'Aluno {i}', 'email': f'aluno{i}@agape.test', 'password_hash': password_hash,
+             'phone': f'1199{i:07d}'[:20], 'created_at': start + timedelta(minutes=i * 10)}
+            for i in range(offset, min(users, offset + CHUNK))
+        ])
+        db.session.commit()
+
+    statuses = [status for status, weight in STATUSES for _ in range(weight)]
+    prices = {course['id']: course['price'] for course in courses}
+    course_ids = list(prices)
+    for offset in range(0, orders, CHUNK):
+        rows = []
+        for _ in range(offset, min(orders, offset + CHUNK)):
+            course_id = rng.choice(course_ids)
+            rows.append({
+                'user_id': rng.randint(1, users), 'course_id': course_id, 'status': rng.choice(statuses),
+                'total_amount': prices[course_id], 'payment_method': rng.choice(PAYMENT_METHODS),
+                'created_at': start + timedelta(seconds=rng.randint(0, 730 * 86400)),
+            })
+        db.session.execute(Order.__table__.insert(), rows)
+        db.session.commit()
+
+
+def scenarios(users):
+    """Nome -> (método, url, kwargs(i) da requisição, status esperado)."""
+    def register(i):
+        return {'json': {'name': 'Novo Aluno', 'email': f'novo-{uuid.uuid4().hex}@agape.test',
+                         'password': PASSWORD}}
+
+    def login(i):
+        return {'json': {'email': f'aluno{random.randrange(users)}@agape.test', 'password': PASSWORD}}
+
+    def checkout(i):
+        return {'json': {'user_id': random.randint(1, users), 'course_id': 'combo', 'amount': 497.0,
+                         'payment_method': 'pix'},
+                'headers': {'Idempotency-Key': uuid.uuid4().hex}}
+
+    def admin(i):
+        return {'headers': {'Authorization': f'Bearer {ADMIN_TOKEN}'}}
+
+    return {
+        'register': ('POST', '/api/register', register, 201),
+        'login': ('POST', '/api/login', login, 200),
+        'checkout': ('POST', '/api/checkout', checkout, 201),
+        'courses': ('GET', '/api/courses', lambda i: {}, 200),
+        'course': ('GET', '/api/courses/combo', lambda i: {}, 200),
+        'search': ('GET', '/api/courses/search?q=massagem', lambda i: {}, 200),
+        'page': ('GET', '/', lambda i: {'headers': {'Accept-Encoding': 'br, gzip'}}, 200),
+        'admin_stats': ('GET', '/api/admin/stats', admin, 200),
+    }
+
+
+def run_scenario(app, scenario, requests, concurrency):
+    method, url, make_kwargs, expected = scenario
+
+    def one(i):
+        client = app.test_client()
+        kwargs = make_kwargs(i)
+        with Timer() as t:
+            response = client.open(url, method=method, **kwargs)
+            response.get_data()
+        if response.status_code in (429, 503):
+            return None  # recusada pelo controle de carga do app
+        if response.status_code != expected:
+            raise RuntimeError(f'{method} {url}: status {response.status_code}, esperado {expected}')
+        return t.elapsed
+
+    # Aquecimento: caches, pool de hash e conexões
+    for i in range(min(concurrency, requests)):
+        one(i)
+    with Timer() as total:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(one, range(requests)))
+    latencies = [elapsed for elapsed in results if elapsed is not None]
+    summary = summarize(latencies, total.elapsed)
+    summary['rejected'] = len(results) - len(latencies)
+    return summary
+
+
+def compare(results, baseline, tolerance):
+    """Lista de regressões: p95 ou vazão piores que a baseline além da tolerância."""
+    regressions = []
+    print(f"\n{'cenário':<14}{'req/s':>10}{'base':>10}{'Δ':>8}{'p95 ms':>10}{'base':>10}{'Δ':>8}")
+    for name, current in results.items():
+        base = baseline['results'].get(name)
+        if base is None:
+            print(f'{name:<14}{current["throughput"]:>10.1f}  (sem baseline)')
+            continue
+        throughput_delta = current['throughput'] / base['throughput'] - 1 if base['throughput'] else 0.0
+        p95_delta = current['p95'] / base['p95'] - 1 if base['p95'] else 0.0
+        flag = ''
+        if (throughput_delta < -tolerance or p95_delta > tolerance
+                or current['rejected'] > base.get('rejected', 0)):
+            regressions.append(name)
+            flag = '  << regressão'
+        print(f"{name:<14}{current['throughput']:>10.1f}{base['throughput']:>10.1f}{throughput_delta:>+8.0%}"
+              f"{current['p95']:>10.2f}{base['p95']:>10.2f}{p95_delta:>+8.0%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--orders', type=int, default=1000000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=400, help='requisições por cenário')
+    parser.add_argument('--scenarios', nargs='+', help='padrão: todos')
+    parser.add_argument('--database-url', help='ex.: postgresql://localhost/agape_bench (banco vazio)')
+    parser.add_argument('--baseline', help='JSON gravado com --record para comparar')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='piora aceita (0.25 = 25%%)')
+    parser.add_argument('--record', help='grava o resultado como baseline neste arquivo')
+    args = parser.parse_args()
+
+    database_url = use_temp_database(args.database_url)
+    # Checkout sem gateway externo e painel admin liberado pelo token da suíte
+    os.environ.pop('ASAAS_API_KEY', None)
+    os.environ['ADMIN_API_TOKEN'] = ADMIN_TOKEN
+    # Todo o tráfego sai do mesmo IP: sem limite de taxa, só o de concorrência
+    for name in ('LOGIN_RATE_IP', 'LOGIN_RATE_EMAIL', 'REGISTER_RATE_IP'):
+        os.environ.setdefault(name, '0')
+    # Fila do hash do tamanho da carga: mede o hash, não a recusa por fila cheia
+    os.environ.setdefault('PASSWORD_HASH_QUEUE', str(args.concurrency * 2))
+    # Sob carga toda consulta parece lenta; o log só poluiria a saída
+    os.environ.setdefault('SLOW_QUERY_MS', '60000')
+    random.seed(SEED)
+
+    import app as app_module
+    from database import DEFAULT_COURSES, create_schema, seed_courses
+    from models import db, User, Order
+    from pages import PageStore, build_pages
+    from stats import rebuild_rollups
+
+    app = app_module.app
+    pages_dir = tempfile.mkdtemp(prefix='agape-bench-pages-')
+    app_module.page_store = PageStore(pages_dir)
+
+    with Timer() as seeding, app.app_context():
+        create_schema()
+        seed_courses()
+        seed_database(db, (User, Order), DEFAULT_COURSES, args.users, args.orders)
+        rebuild_rollups()
+        build_pages(app, pages_dir)
+    print(f"Banco: {database_url.split('@')[-1]} com {args.users} alunos e {args.orders} pedidos "
+          f"(populado em {seeding.elapsed:.1f}s)")
+    print(f"{args.requests} requisições por cenário, concorrência {args.concurrency}\n")
+
+    available = scenarios(args.users)
+    names = args.scenarios or list(available)
+    results = {}
+    for name in names:
+        results[name] = run_scenario(app, available[name], args.requests, args.concurrency)
+        print_summary(name, results[name])
+        if results[name]['rejected']:
+            print(f"  {results[name]['rejected']} recusadas (429/503)")
+    shutil.rmtree(pages_dir, ignore_errors=True)
+
+    meta = {
+        'users': args.users, 'orders': args.orders, 'concurrency': args.concurrency,
+        'requests': args.requests, 'database': database_url.split(':')[0],
+        'python': platform.python_version(), 'machine': platform.machine(),
+        'cpus': os.cpu_count(), 'recorded_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+    if args.record:
+        os.makedirs(os.path.dirname(os.path.abspath(args.record)), exist_ok=True)
+        with open(args.record, 'w', encoding='utf-8') as f:
+            json.dump({'meta': meta, 'results': results}, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'\nBaseline gravada em {args.record}')
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        different = [key for key in ('users', 'orders', 'concurrency', 'database', 'cpus')
+                     if baseline['meta'].get(key) != meta[key]]
+        if different:
+            print(f"\nAviso: baseline gravada com outros parâmetros ({', '.join(different)})")
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            raise SystemExit(f"\nRegressão em: {', '.join(regressions)}")
+        print('\nSem regressões.')
+
+
+if __name__ == '__main__':
+    main()
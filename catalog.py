@@ -0,0 +1,96 @@
+"""
+Cache em memória do catálogo de cursos.
+
+O catálogo muda poucas vezes por mês, então o JSON é serializado uma vez e
+reaproveitado até a próxima escrita em Course. Cada escrita confirmada
+incrementa um contador de versão; a próxima leitura reconstrói o cache.
+"""
+
+import hashlib
+import json
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models import Course
+
+
+class CourseCatalog:
+    """JSON pré-serializado do catálogo com ETag forte por documento."""
+
+    def __init__(self, ttl=60):
+        # ttl limita por quanto tempo outro worker pode servir dados antigos,
+        # já que a invalidação só acontece no processo que fez a escrita
+        self.ttl = ttl
+        self.version = 0
+        self._lock = threading.Lock()
+        self._built_version = -1
+        self._built_at = 0.0
+        self._list = None
+        self._items = {}
+        self._listeners = []
+
+    def subscribe(self, callback):
+        """Registra uma função chamada após cada escrita confirmada em Course."""
+        self._listeners.append(callback)
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+        for callback in self._listeners:
+            callback()
+
+    def _serialize(self, payload):
+        body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+        return body, hashlib.sha256(body).hexdigest()[:32]
+
+    def _ensure_fresh(self):
+        if self._built_version == self.version and time.monotonic() - self._built_at < self.ttl:
+            return
+        with self._lock:
+            version = self.version
+            if self._built_version == version and time.monotonic() - self._built_at < self.ttl:
+                return
+            courses = [c.to_dict() for c in Course.query.order_by(Course.id).all()]
+            self._list = self._serialize({'success': True, 'data': courses})
+            self._items = {c['id']: self._serialize({'success': True, 'data': c}) for c in courses}
+            self._built_version = version
+            self._built_at = time.monotonic()
+
+    def get_list(self):
+        """Retorna (body, etag) da lista completa."""
+        self._ensure_fresh()
+        return self._list
+
+    def get_item(self, course_id):
+        """Retorna (body, etag) de um curso ou None se não existir."""
+        self._ensure_fresh()
+        return self._items.get(course_id)
+
+
+catalog = CourseCatalog()
+
+
+# --- Invalidação ---
+# Marca a sessão no flush e só incrementa a versão após o commit, para que uma
+# leitura concorrente não reconstrua o cache com dados ainda não confirmados.
+@event.listens_for(Course, 'after_insert')
+@event.listens_for(Course, 'after_update')
+@event.listens_for(Course, 'after_delete')
+def _mark_catalog_dirty(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info['catalog_dirty'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _bump_catalog_version(session):
+    if session.info.pop('catalog_dirty', False):
+        catalog.invalidate()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_catalog_mark(session):
+    session.info.pop('catalog_dirty', None)
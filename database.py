@@ -0,0 +1,183 @@
+"""
+Perfis de engine do banco de dados.
+
+O perfil é escolhido por DB_PROFILE; sem ele, usa o padrão do tipo de banco
+da URL (sqlite-wal para SQLite, postgres para Postgres).
+
+Nos perfis Postgres cada conexão nova recebe statement_timeout (milissegundos,
+0 desliga): o do perfil, ou DB_STATEMENT_TIMEOUT. Comandos de manutenção
+(db-init, stats-rebuild, import-students) chamam use_maintenance_timeout(),
+que troca o limite por DB_MAINTENANCE_STATEMENT_TIMEOUT (padrão 0, sem limite)
+antes de abrir conexões.
+"""
+
+import os
+
+from sqlalchemy import event, inspect, text
+from sqlalchemy.schema import CreateIndex
+
+from models import db, Course
+
+PROFILES = {
+    # WAL deixa leitores e o escritor trabalharem ao mesmo tempo; NORMAL só
+    # sincroniza no checkpoint, o que é seguro em WAL
+    'sqlite-wal': {
+        'pragmas': {
+            'journal_mode': 'WAL',
+            'synchronous': 'NORMAL',
+            'busy_timeout': 5000,
+            'mmap_size': 256 * 1024 * 1024,
+            'cache_size': -64000,  # em KiB quando negativo (~64 MB)
+            'temp_store': 'MEMORY',
+        },
+        'engine_options': {},
+    },
+    # Comportamento antigo (rollback journal), mantido para comparação
+    'sqlite-legacy': {
+        'pragmas': {
+            'journal_mode': 'DELETE',
+            'synchronous': 'FULL',
+        },
+        'engine_options': {},
+    },
+    'postgres': {
+        'pragmas': {},
+        'engine_options': {
+            'pool_size': 10,
+            'max_overflow': 10,
+            'pool_timeout': 10,
+            'pool_recycle': 1800,
+            'pool_pre_ping': True,
+        },
+        'statement_timeout': 5000,
+    },
+    # Hospedagens com poucas conexões disponíveis por processo
+    'postgres-small': {
+        'pragmas': {},
+        'engine_options': {
+            'pool_size': 3,
+            'max_overflow': 2,
+            'pool_timeout': 10,
+            'pool_recycle': 900,
+            'pool_pre_ping': True,
+        },
+        'statement_timeout': 5000,
+    },
+}
+
+
+# Cursos criados no primeiro deploy
+DEFAULT_COURSES = [
+    {'id': 'combo', 'name': 'Combo Completo (2 em 1)', 'price': 497.00, 'description': 'Terapia Capilar + Massagem'},
+    {'id': 'terapia-capilar', 'name': 'Pilar 1: Terapia Capilar', 'price': 297.00, 'description': 'Curso de Terapia Capilar'},
+    {'id': 'massagem', 'name': 'Pilar 2: Massagem Terapêutica', 'price': 297.00, 'description': 'Curso de Massagem Terapêutica'},
+]
+
+
+def default_profile(database_url):
+    return 'sqlite-wal' if database_url.startswith('sqlite') else 'postgres'
+
+
+def init_database(app, database_url, profile=None):
+    """Configura a URL e o perfil do engine e registra o db no app."""
+    profile = profile or os.getenv('DB_PROFILE') or default_profile(database_url)
+    if profile not in PROFILES:
+        raise ValueError(f"Perfil de banco desconhecido: {profile} (opções: {', '.join(PROFILES)})")
+    settings = PROFILES[profile]
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = settings['engine_options']
+    app.config['DB_PROFILE'] = profile
+    db.init_app(app)
+
+    pragmas = settings['pragmas']
+    if pragmas:
+        # O engine é criado no init_app, mas nenhuma conexão é aberta aqui
+        with app.app_context():
+            event.listen(db.engine, 'connect', lambda conn, record: apply_pragmas(conn, pragmas))
+    if 'statement_timeout' in settings:
+        app.config['DB_STATEMENT_TIMEOUT'] = int(os.getenv('DB_STATEMENT_TIMEOUT', settings['statement_timeout']))
+        # Lido a cada conexão nova: use_maintenance_timeout() pode trocá-lo depois
+        with app.app_context():
+            event.listen(db.engine, 'do_connect',
+                         lambda dialect, record, cargs, cparams: apply_statement_timeout(app, cparams))
+    return profile
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+    cursor.close()
+
+
+def apply_statement_timeout(app, cparams):
+    option = f"-c statement_timeout={app.config['DB_STATEMENT_TIMEOUT']}"
+    cparams['options'] = f"{cparams['options']} {option}" if cparams.get('options') else option
+
+
+def use_maintenance_timeout(app):
+    """Troca o statement_timeout das próximas conexões pelo de manutenção."""
+    if 'DB_STATEMENT_TIMEOUT' not in app.config:
+        return
+    app.config['DB_STATEMENT_TIMEOUT'] = int(os.getenv('DB_MAINTENANCE_STATEMENT_TIMEOUT', '0'))
+    # Conexões já abertas ficariam com o limite antigo
+    db.engine.dispose()
+
+
+def create_schema():
+    """Cria tabelas novas e índices que ainda não existem. Idempotente."""
+    db.create_all()
+    add_missing_columns()
+    # create_all não cria índices novos em tabelas que já existem. IF NOT EXISTS
+    # em vez de checkfirst: a reflexão não enxerga índices de expressão
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                connection.execute(CreateIndex(index, if_not_exists=True))
+
+    # Índice de busca (FTS5 / tsvector), fora dos modelos do ORM
+    from search import create_search_index, reindex
+    with db.engine.begin() as connection:
+        create_search_index(connection)
+        reindex(connection)
+
+
+def add_missing_columns():
+    """
+    Adiciona colunas novas (anuláveis) a tabelas que já existem, o que o
+    create_all também não faz. Mudanças de tipo ou colunas obrigatórias
+    continuam exigindo migração manual.
+    """
+    existing = inspect(db.engine)
+    with db.engine.begin() as connection:
+        for table in db.metadata.sorted_tables:
+            if not existing.has_table(table.name):
+                continue
+            columns = {column['name'] for column in existing.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in columns or not column.nullable:
+                    continue
+                column_type = column.type.compile(dialect=connection.dialect)
+                connection.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'))
+
+
+def upsert_insert(connection, table):
+    """insert() do dialeto da conexão, que tem on_conflict_do_update/do_nothing."""
+    dialect = connection.dialect.name
+    if dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    elif dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        raise NotImplementedError(f'Upsert não suportado em {dialect}')
+    return insert(table)
+
+
+def seed_courses():
+    """Popula os cursos padrão num banco vazio. Retorna True se inseriu."""
+    if Course.query.first():
+        return False
+    db.session.add_all(Course(**course) for course in DEFAULT_COURSES)
+    db.session.commit()
+    return True
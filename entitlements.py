@@ -0,0 +1,133 @@
+"""
+Cursos liberados para cada aluno, com cache em memória.
+
+As páginas do aluno e a biblioteca perguntam a cada visualização quais cursos
+o aluno comprou. A resposta fica num LRU por aluno com TTL, e é descartada
+exatamente quando um pedido daquele aluno é criado, muda de status ou é
+removido: o flush marca os alunos afetados e o commit os invalida (um rollback
+descarta a marca). Na consulta, o índice (user_id, status, course_id) responde
+sem tocar na tabela.
+
+A invalidação só acontece no processo que fez o commit; nos demais workers o
+TTL limita por quanto tempo um pagamento confirmado ainda não aparece.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+from metrics import Counter
+from models import db, Order
+
+# O combo dá acesso aos cursos dos dois pilares
+BUNDLES = {'combo': ('terapia-capilar', 'massagem')}
+
+
+def paid_courses(user_id):
+    """Cursos com pedido pago do aluno, direto do banco."""
+    rows = (db.session.query(Order.course_id)
+            .filter(Order.user_id == user_id, Order.status == 'paid')
+            .distinct())
+    return {course_id for (course_id,) in rows}
+
+
+def with_bundles(course_ids):
+    """Inclui os cursos que fazem parte dos combos comprados."""
+    courses = set(course_ids)
+    for bundle in course_ids:
+        courses.update(BUNDLES.get(bundle, ()))
+    return frozenset(courses)
+
+
+class EntitlementCache:
+    def __init__(self, max_users=50000, ttl=30):
+        self.max_users = max_users
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = 0
+        self.lookups = Counter('entitlement_cache_total', 'Consultas aos cursos liberados por aluno.', ('result',))
+
+    def get(self, user_id):
+        """frozenset dos cursos liberados para o aluno (com os incluídos nos combos)."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.lookups.inc(('hit',))
+                return entry[1]
+            version = self._version
+        self.lookups.inc(('miss',))
+        courses = with_bundles(paid_courses(user_id))
+        with self._lock:
+            # Um pedido confirmado durante a consulta deixaria o resultado antigo
+            if self._version == version:
+                self._entries[user_id] = (now + self.ttl, courses)
+                self._entries.move_to_end(user_id)
+                if len(self._entries) > self.max_users:
+                    self._entries.popitem(last=False)
+        return courses
+
+    def invalidate(self, user_ids):
+        with self._lock:
+            self._version += 1
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._entries.clear()
+
+
+entitlements = EntitlementCache()
+
+
+def has_access(user_id, course_id):
+    return course_id in entitlements.get(user_id)
+
+
+# --- Invalidação ---
+# Como no catálogo: marca no flush, invalida só depois do commit
+@event.listens_for(Session, 'after_flush')
+def _mark_entitlements_dirty(session, flush_context):
+    # new/dirty/deleted e o histórico ainda refletem o estado anterior ao flush
+    users = []
+    for obj in session.new:
+        if isinstance(obj, Order):
+            users.append(obj.user_id)
+    for obj in session.dirty:
+        if isinstance(obj, Order):
+            state = inspect(obj)
+            if any(state.attrs[name].history.has_changes() for name in ('status', 'course_id', 'user_id')):
+                # Pedido passado para outro aluno invalida os dois
+                users.append(obj.user_id)
+                users.extend(state.attrs.user_id.history.deleted)
+    for obj in session.deleted:
+        if isinstance(obj, Order):
+            users.append(obj.user_id)
+    mark_dirty(session, users)
+
+
+def mark_dirty(session, user_ids):
+    """Invalida os alunos no commit da sessão (para pedidos gravados em Core)."""
+    # O checkout pode gravar o user_id como veio no JSON; o cache usa int
+    users = {int(user_id) for user_id in user_ids if str(user_id).isdigit()}
+    if users:
+        session.info.setdefault('entitlements_dirty', set()).update(users)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_entitlements(session):
+    users = session.info.pop('entitlements_dirty', None)
+    if users:
+        entitlements.invalidate(users)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_entitlements_mark(session):
+    session.info.pop('entitlements_dirty', None)
@@ -0,0 +1,116 @@
+"""
+Exportação em streaming (CSV e NDJSON) de pedidos e alunos.
+
+As linhas vêm do banco em lotes pelo Projection.iter (yield_per, cursor do
+lado do servidor no Postgres) e são escritas na resposta à medida que chegam:
+a memória não cresce com o tamanho da tabela e o cabeçalho sai antes de a
+consulta terminar. No CSV, textos que a planilha leria como fórmula recebem um
+apóstrofo na frente.
+"""
+
+import csv
+import io
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func
+
+from models import db, User, Course, Order
+from projections import Projection, dumps
+
+BATCH_SIZE = 1000
+
+# Planilhas executam células que começam com estes caracteres como fórmula
+FORMULA_PREFIXES = ('=', '+', '-', '@', '\t', '\r')
+
+ORDER_EXPORT = Projection(order_id=Order.id, created_at=Order.created_at, status=Order.status,
+                          total_amount=Order.total_amount, payment_method=Order.payment_method,
+                          course_id=Order.course_id, course_name=Course.name,
+                          user_id=User.id, user_name=User.name, user_email=User.email)
+STUDENT_EXPORT = Projection(user_id=User.id, name=User.name, email=User.email, phone=User.phone,
+                            created_at=User.created_at,
+                            paid_orders=select(func.count(Order.id))
+                            .where(Order.user_id == User.id, Order.status == 'paid')
+                            .correlate(User)
+                            .scalar_subquery())
+
+MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+def _date_range(column, start, end):
+    clauses = []
+    if start:
+        clauses.append(column >= datetime.combine(start, datetime.min.time()))
+    if end:
+        clauses.append(column < datetime.combine(end + timedelta(days=1), datetime.min.time()))
+    return clauses
+
+
+def order_rows(start=None, end=None):
+    stmt = (
+        ORDER_EXPORT.select()
+        .join(User, User.id == Order.user_id)
+        .outerjoin(Course, Course.id == Order.course_id)
+        .where(*_date_range(Order.created_at, start, end))
+        .order_by(Order.id)
+    )
+    return ORDER_EXPORT.iter(stmt)
+
+
+def student_rows(start=None, end=None):
+    stmt = (
+        STUDENT_EXPORT.select()
+        .where(*_date_range(User.created_at, start, end))
+        .order_by(User.id)
+    )
+    return STUDENT_EXPORT.iter(stmt)
+
+
+def _csv_cell(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        # Nomes e emails vêm do cadastro: "=HYPERLINK(...)" vira texto na planilha
+        return "'" + value
+    return value
+
+
+def stream_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    # O cabeçalho sai antes de a primeira linha ser buscada
+    yield buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate()
+    for count, row in enumerate(rows, 1):
+        writer.writerow([_csv_cell(row[column]) for column in columns])
+        if count % BATCH_SIZE == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def stream_ndjson(columns, rows):
+    chunk = []
+    for row in rows:
+        chunk.append(dumps(row))
+        if len(chunk) == BATCH_SIZE:
+            yield b'\n'.join(chunk) + b'\n'
+            chunk = []
+    if chunk:
+        yield b'\n'.join(chunk) + b'\n'
+
+
+DATASETS = {
+    'orders': (ORDER_EXPORT.keys, order_rows),
+    'students': (STUDENT_EXPORT.keys, student_rows),
+}
+FORMATS = {'csv': stream_csv, 'ndjson': stream_ndjson}
+
+
+def export(dataset, fmt, start=None, end=None):
+    """Gerador com o conteúdo do export."""
+    columns, rows = DATASETS[dataset]
+    return FORMATS[fmt](columns, rows(start, end))
@@ -0,0 +1,280 @@
+"""
+Cliente do gateway de pagamento (Asaas).
+
+O api/checkout.php fazia três ou quatro chamadas HTTP em sequência por compra
+(busca do cliente, criação do cliente, cobrança, QR Code PIX), cada uma com
+uma conexão nova. Aqui:
+
+- as conexões ficam abertas num pool (keep-alive), por processo;
+- o id do cliente no gateway fica salvo no User, e quem já comprou pula a busca;
+- para quem compra pela primeira vez, a busca do cliente roda em paralelo com
+  a gravação do pedido;
+- cada chamada tem timeout, e as retentativas saem de um orçamento comum para
+  não multiplicar a carga num gateway já degradado;
+- todo POST leva uma chave de idempotência derivada do usuário ou do pedido,
+  então uma retentativa não cria cliente ou cobrança em dobro.
+"""
+
+import http.client
+import json
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from urllib.parse import urlencode, urlsplit
+
+from models import db, Order
+
+BILLING_TYPES = {'credit_card': 'CREDIT_CARD', 'boleto': 'BOLETO'}  # demais: PIX
+
+
+class GatewayError(Exception):
+    def __init__(self, message, status=None, details=None):
+        super().__init__(message)
+        self.status = status
+        self.details = details
+
+
+class RetryBudget:
+    """
+    Cada requisição deposita `ratio` fichas (até `burst`) e cada retentativa
+    gasta uma: com o gateway fora do ar, as retentativas ficam limitadas a
+    ~ratio das requisições em vez de multiplicá-las.
+    """
+
+    def __init__(self, ratio=0.2, burst=10):
+        self.ratio = ratio
+        self.burst = burst
+        self._tokens = float(burst)
+        self._lock = threading.Lock()
+
+    def deposit(self):
+        with self._lock:
+            self._tokens = min(self.burst, self._tokens + self.ratio)
+
+    def withdraw(self):
+        with self._lock:
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class _ConnectionPool:
+    def __init__(self, url, size, timeout):
+        parts = urlsplit(url)
+        self.connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.host = parts.hostname
+        self.port = parts.port
+        self.prefix = parts.path.rstrip('/')
+        self.size = size
+        self.timeout = timeout
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def _reset(self):
+        # Conexões abertas antes de um fork não podem ser usadas no filho. Com
+        # o lock, duas threads na primeira chamada não trocam o semáforo uma da outra
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._idle = queue.LifoQueue()
+            self._slots = threading.BoundedSemaphore(self.size)
+            self._pid = os.getpid()
+
+    def acquire(self):
+        if self._pid != os.getpid():
+            self._reset()
+        if not self._slots.acquire(timeout=self.timeout):
+            raise GatewayError('Nenhuma conexão livre com o gateway')
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self.connection_class(self.host, self.port, timeout=self.timeout), False
+
+    def release(self, connection, reuse):
+        if reuse:
+            self._idle.put(connection)
+        else:
+            connection.close()
+        self._slots.release()
+
+
+class GatewayClient:
+    def __init__(self, base_url, api_key, timeout=10, retries=2, backoff=0.2, pool_size=10, budget=None):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.budget = budget or RetryBudget()
+        self._pool = _ConnectionPool(base_url, pool_size, timeout)
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    # --- HTTP ---
+
+    def request(self, method, path, params=None, body=None, idempotency_key=None, timeout=None):
+        """JSON da resposta. GET e POST com chave de idempotência são retentados."""
+        retryable = method == 'GET' or idempotency_key is not None
+        self.budget.deposit()
+        attempt = 0
+        while True:
+            try:
+                status, data = self._send(method, path, params, body, idempotency_key, timeout or self.timeout)
+            except (OSError, http.client.HTTPException) as error:
+                failure = GatewayError(f'Falha de comunicação com o gateway: {error}')
+            else:
+                if status < 400:
+                    return data
+                if status < 500 and status != 429:
+                    raise GatewayError('Gateway recusou a requisição', status, data)
+                failure = GatewayError('Gateway indisponível', status, data)
+
+            if not retryable or attempt >= self.retries or not self.budget.withdraw():
+                raise failure
+            attempt += 1
+            time.sleep(self.backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5))
+
+    def _send(self, method, path, params, body, idempotency_key, timeout):
+        url = f'{self._pool.prefix}/{path}'
+        if params:
+            url += '?' + urlencode(params)
+        headers = {
+            'Content-Type': 'application/json',
+            'access_token': self.api_key,
+            'User-Agent': 'AgapeCursos/1.0',
+        }
+        if idempotency_key:
+            headers['Idempotency-Key'] = idempotency_key
+        payload = json.dumps(body).encode('utf-8') if body is not None else None
+
+        connection, reused = self._pool.acquire()
+        reuse = False
+        try:
+            connection.timeout = timeout
+            if connection.sock is not None:
+                connection.sock.settimeout(timeout)
+            connection.request(method, url, body=payload, headers=headers)
+            response = connection.getresponse()
+            raw = response.read()
+            reuse = not response.will_close
+        finally:
+            self._pool.release(connection, reuse)
+        try:
+            return response.status, json.loads(raw) if raw else None
+        except ValueError:
+            return response.status, None
+
+    def submit(self, fn, *args):
+        """Executa fn numa thread do cliente (ex.: chamada em paralelo com o banco)."""
+        if self._executor is None or self._executor_pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._executor_pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(max_workers=self._pool.size,
+                                                        thread_name_prefix='gateway')
+                    self._executor_pid = os.getpid()
+        return self._executor.submit(fn, *args)
+
+    # --- API do Asaas ---
+
+    def resolve_customer(self, user_id, name, email, phone=None, cpf=None):
+        """Id do cliente com este email no gateway, criando-o se não existir."""
+        found = self.request('GET', 'customers', params={'email': email})
+        if found and found.get('data'):
+            return found['data'][0]['id']
+        customer = {'name': name or 'Aluno Ágape', 'email': email}
+        if cpf:
+            customer['cpfCnpj'] = cpf
+        if phone:
+            customer['mobilePhone'] = phone
+        created = self.request('POST', 'customers', body=customer, idempotency_key=f'customer-{user_id}')
+        return created['id']
+
+    def create_payment(self, customer_id, order, billing_type):
+        return self.request('POST', 'payments', body={
+            'customer': customer_id,
+            'billingType': billing_type,
+            'value': float(order['total_amount']),
+            'dueDate': (date.today() + timedelta(days=2)).isoformat(),
+            'description': f"Curso Ágape: {order['course_id']}",
+            'externalReference': str(order['id']),
+        }, idempotency_key=f"order-{order['id']}")
+
+    def get_payment(self, payment_id):
+        return self.request('GET', f'payments/{payment_id}')
+
+    def find_payment(self, order_id):
+        found = self.request('GET', 'payments', params={'externalReference': str(order_id)})
+        if found and found.get('data'):
+            return found['data'][0]
+        return None
+
+    def pix_qr_code(self, payment_id):
+        return self.request('GET', f'payments/{payment_id}/pixQrCode')
+
+
+def gateway_from_env():
+    """Cliente configurado por ASAAS_API_URL/ASAAS_API_KEY; None sem a chave."""
+    api_key = os.getenv('ASAAS_API_KEY')
+    if not api_key:
+        return None
+    return GatewayClient(
+        os.getenv('ASAAS_API_URL', 'https://sandbox.asaas.com/api/v3'),
+        api_key,
+        timeout=float(os.getenv('ASAAS_TIMEOUT', '10')),
+        retries=int(os.getenv('ASAAS_RETRIES', '2')),
+        pool_size=int(os.getenv('ASAAS_POOL_SIZE', '10')),
+    )
+
+
+def start_checkout(client, user, submit_order, payment_method, cpf=None):
+    """
+    Grava o pedido pendente (submit_order() -> (order_dict, created), como
+    OrderWriter.submit) e cria a cobrança. Retorna (order, created, payment).
+    """
+    customer = None
+    if not user.gateway_customer_id:
+        # Quem compra pela primeira vez: busca/cria o cliente enquanto o pedido é gravado
+        customer = client.submit(client.resolve_customer, user.id, user.name, user.email, user.phone, cpf)
+    order, created = submit_order()
+    if customer is not None:
+        user.gateway_customer_id = customer.result()
+        db.session.commit()
+
+    billing_type = BILLING_TYPES.get(payment_method, 'PIX')
+    payment_id = db.session.query(Order.payment_id).filter_by(id=order['id']).scalar()
+    payment = None
+    if payment_id:
+        payment = client.get_payment(payment_id)
+    elif not created:
+        # Repetição de um checkout que caiu antes de salvar a cobrança
+        payment = client.find_payment(order['id'])
+    if payment is None:
+        try:
+            payment = client.create_payment(user.gateway_customer_id, order, billing_type)
+        except GatewayError as error:
+            if customer is not None or error.status not in (400, 404):
+                raise
+            # Id em cache de um cliente removido no gateway: resolve de novo
+            user.gateway_customer_id = client.resolve_customer(user.id, user.name, user.email, user.phone, cpf)
+            db.session.commit()
+            payment = client.create_payment(user.gateway_customer_id, order, billing_type)
+    if payment['id'] != payment_id:
+        Order.query.filter_by(id=order['id']).update({'payment_id': payment['id']})
+        db.session.commit()
+
+    result = {
+        'payment_id': payment['id'],
+        'invoiceUrl': payment.get('invoiceUrl'),
+        'status': payment.get('status'),
+    }
+    if billing_type == 'PIX':
+        pix = client.pix_qr_code(payment['id'])
+        if pix and pix.get('payload'):
+            result['pix_payload'] = pix['payload']
+            result['pix_encoded_image'] = pix.get('encodedImage')
+    return order, created, result
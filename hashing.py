@@ -0,0 +1,108 @@
+"""
+Hash de senhas fora da thread da requisição.
+
+generate_password_hash/check_password_hash custam dezenas a centenas de ms de
+CPU. Aqui eles rodam num pool de processos (fora do GIL), com uma fila limitada:
+quando a fila enche, a requisição falha rápido em vez de empilhar trabalho.
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError
+
+from werkzeug.security import generate_password_hash, check_password_hash
+
+
+class HashQueueFull(Exception):
+    """A fila do pool de hash está cheia ou não andou a tempo; o chamador deve responder 503."""
+
+
+def _verify(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+class PasswordHasher:
+    """
+    Pool de hash com método/custo configurável.
+
+    workers=0 executa tudo inline (útil em desenvolvimento e scripts).
+    """
+
+    def __init__(self, method='scrypt', workers=None, max_pending=None, timeout=10):
+        self.method = method
+        self.workers = (os.cpu_count() or 1) if workers is None else workers
+        self.max_pending = max_pending or self.workers * 4
+        self.timeout = timeout
+        self._prefix = None
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._executor_lock:
+                if self._executor is None:
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        if not self._slots.acquire(blocking=False):
+            raise HashQueueFull()
+        try:
+            future = self._get_executor().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # A vaga só volta quando o hash termina (ou é cancelado), não no timeout
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except TimeoutError:
+            future.cancel()
+            raise HashQueueFull()
+
+    def hash(self, password):
+        return self._run(generate_password_hash, password, self.method)
+
+    def hash_many(self, passwords):
+        """
+        Hash de um lote (importações), distribuído entre todos os processos.
+        Não passa pela fila limitada: é trabalho em lote, não de requisição, e
+        por isso deve rodar num PasswordHasher separado do que atende login e
+        cadastro (senão o lote ocupa os processos e as requisições expiram).
+        """
+        if not self.workers:
+            return [generate_password_hash(p, self.method) for p in passwords]
+        chunksize = max(1, len(passwords) // (self.workers * 4))
+        return list(self._get_executor().map(generate_password_hash, passwords,
+                                             [self.method] * len(passwords), chunksize=chunksize))
+
+    @property
+    def prefix(self):
+        # Prefixo completo (ex.: 'scrypt:32768:8:1') usado para detectar hashes
+        # gerados com um custo antigo; calculado sob demanda para não pagar um
+        # hash no import
+        if self._prefix is None:
+            self._prefix = self.hash('').split('$', 1)[0]
+        return self._prefix
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != self.prefix
+
+    def verify(self, password_hash, password):
+        """
+        Retorna (ok, novo_hash). novo_hash só vem preenchido quando a senha
+        confere e o hash armazenado usa um método/custo desatualizado.
+        """
+        if not self._run(_verify, password_hash, password):
+            return False, None
+        if self.needs_rehash(password_hash):
+            return True, self.hash(password)
+        return True, None
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
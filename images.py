@@ -0,0 +1,223 @@
+"""
+Derivados responsivos das imagens locais (AVIF/WebP/PNG em várias larguras).
+
+O logo de 1024 px era servido inteiro em todo lugar, até como favicon. Aqui
+cada imagem de static/img referenciada pelas páginas ganha versões
+redimensionadas nas larguras de WIDTHS, em AVIF e WebP (quando o Pillow
+suporta) e no formato original, e as tags viram <picture> com srcset/sizes e
+width/height, para o navegador baixar só o tamanho que vai mostrar e reservar o
+espaço antes de a imagem chegar. Ícones (favicon e apple-touch-icon) ganham
+PNGs quadrados do tamanho certo.
+
+Os arquivos ficam em static/dist/img com o hash do original no nome, então
+recebem cache de um ano e uma imagem já processada não é decodificada de novo.
+Imagens remotas (URLs http) ficam como estão: o build roda offline.
+"""
+
+import hashlib
+import html
+import json
+import math
+import os
+import re
+
+try:
+    from PIL import Image, ImageOps, features
+except ImportError:  # Pillow é opcional: sem ele as tags não são alteradas
+    Image = None
+
+from assets import DIST_DIR
+
+IMAGE_DIR = 'img'
+MANIFEST_NAME = 'images.json'
+WIDTHS = (64, 128, 256, 512, 768, 1024, 1600)
+ICON_SIZES = {'icon': 48, 'apple-touch-icon': 180}
+
+# Mudar qualquer ajuste de codificação muda o hash e gera os arquivos de novo
+ENCODERS = {
+    'avif': {'quality': 55},
+    'webp': {'quality': 80, 'method': 6},
+    'png': {'optimize': True},
+    'jpeg': {'quality': 82, 'optimize': True, 'progressive': True},
+}
+MIMETYPES = {'avif': 'image/avif', 'webp': 'image/webp'}
+
+IMG_TAG = re.compile(r'''<img\b([^>]*?)\s*/?>''')
+ICON_LINK = re.compile(r'''<link\s+rel=["'](icon|apple-touch-icon)["']([^>]*?)\bhref=["']/?(static/img/[^"']+)["']([^>]*)>''')
+ATTR = re.compile(r'''\s*\b([a-zA-Z-]+)=(["'])(.*?)\2''', re.S)
+LOCAL_SRC = re.compile(r'''^/?(static/img/[^"'?#]+)$''')
+# Altura fixa do Tailwind (h-10 = 2.5rem = 40 px) com largura automática
+TAILWIND_HEIGHT = re.compile(r'\bh-(\d+)\b')
+
+
+def available():
+    return Image is not None
+
+
+class ImageBuilder:
+    def __init__(self, root_dir, static_folder):
+        self.root_dir = root_dir
+        self.static_folder = static_folder
+        self.output_dir = os.path.join(static_folder, DIST_DIR, IMAGE_DIR)
+        self.url_prefix = f'/static/{DIST_DIR}/{IMAGE_DIR}/'
+        self.formats = ['avif', 'webp'] if available() and features.check('avif') else ['webp']
+        self.manifest = self._load_manifest()
+        self.generated = 0
+
+    def _load_manifest(self):
+        try:
+            with open(os.path.join(self.output_dir, MANIFEST_NAME), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'images': {}, 'icons': {}}
+
+    def write_manifest(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        with open(os.path.join(self.output_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+
+    # --- Reescrita das páginas ---
+
+    def rewrite(self, page, html_text):
+        """Troca <img> locais por <picture> com srcset e aponta os ícones para os derivados."""
+        if not available():
+            return html_text
+        html_text = ICON_LINK.sub(self._replace_icon, html_text)
+        return IMG_TAG.sub(self._replace_img, html_text)
+
+    def _replace_icon(self, match):
+        rel, before, src, after = match.groups()
+        url = self.icon(src, ICON_SIZES[rel])
+        if url is None:
+            return match.group(0)
+        size = ICON_SIZES[rel]
+        return f'<link rel="{rel}"{before}href="{url}" sizes="{size}x{size}"{after}>'
+
+    def _replace_img(self, match):
+        attrs = {name.lower(): value for name, _, value in ATTR.findall(match.group(1))}
+        local = LOCAL_SRC.match(attrs.get('src', ''))
+        if local is None or 'srcset' in attrs:
+            return match.group(0)
+        entry = self.derivatives(local.group(1))
+        if entry is None:
+            return match.group(0)
+
+        display_width = self._display_width(attrs.get('class', ''), entry)
+        sizes = attrs.pop('sizes', None) or (f'{display_width}px' if display_width else '100vw')
+        fallback = entry['fallback']
+        # Sem suporte a srcset, vai a menor versão que cobre uma tela 2x
+        target = display_width * 2 if display_width else entry['width']
+        src_width = next((w for w in sorted(map(int, entry['variants'][fallback])) if w >= target), entry['width'])
+
+        attrs['src'] = entry['variants'][fallback][str(src_width)]
+        attrs['srcset'] = self._srcset(entry['variants'][fallback])
+        attrs['sizes'] = sizes
+        attrs.setdefault('width', str(entry['width']))
+        attrs.setdefault('height', str(entry['height']))
+        img = '<img ' + ' '.join(f'{name}="{html.escape(value, quote=True)}"' for name, value in attrs.items()) + '>'
+        sources = ''.join(
+            f'<source type="{MIMETYPES[fmt]}" srcset="{self._srcset(entry["variants"][fmt])}" sizes="{sizes}">'
+            for fmt in self.formats if fmt in entry['variants'])
+        # display: contents mantém o layout da <img> (h-full, flex) como antes
+        return f'<picture style="display: contents">{sources}{img}</picture>'
+
+    def _srcset(self, variants):
+        return ', '.join(f'{url} {width}w' for width, url in sorted(variants.items(), key=lambda item: int(item[0])))
+
+    def _display_width(self, classes, entry):
+        # Só dá para saber a largura exibida quando a altura é fixa e a largura automática
+        height = TAILWIND_HEIGHT.search(classes)
+        if height is None or 'w-auto' not in classes.split():
+            return None
+        return math.ceil(int(height.group(1)) * 4 * entry['width'] / entry['height'])
+
+    # --- Geração ---
+
+    def derivatives(self, src):
+        """Metadados e URLs dos derivados de static/img/..., gerando os que faltam."""
+        path = os.path.join(self.root_dir, src)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        digest = self._digest(data)
+        entry = self.manifest['images'].get(src)
+        if entry is not None and entry['hash'] == digest and self._complete(entry):
+            return entry  # já processada: nem decodifica
+
+        with Image.open(path) as original:
+            image = ImageOps.exif_transpose(original)
+            image.load()
+            source_format = 'jpeg' if original.format == 'JPEG' else 'png'
+        if source_format == 'jpeg' and image.mode not in ('RGB', 'L'):
+            image = image.convert('RGB')
+        elif image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+            image = image.convert('RGBA')
+        stem = os.path.splitext(os.path.basename(src))[0]
+        widths = [w for w in WIDTHS if w < image.width] + [image.width]
+        variants = {}
+        for fmt in self.formats + [source_format]:
+            variants[fmt] = {}
+            for width in widths:
+                filename = f'{stem}.{digest}.{width}.{"jpg" if fmt == "jpeg" else fmt}'
+                self._write(filename, fmt, image, width, round(image.height * width / image.width))
+                variants[fmt][str(width)] = self.url_prefix + filename
+        entry = {'hash': digest, 'width': image.width, 'height': image.height,
+                 'fallback': source_format, 'variants': variants}
+        self.manifest['images'][src] = entry
+        return entry
+
+    def icon(self, src, size):
+        """URL de um PNG quadrado size x size da imagem, com o logo centralizado."""
+        path = os.path.join(self.root_dir, src)
+        try:
+            with open(path, 'rb') as f:
+                digest = self._digest(f.read())
+        except FileNotFoundError:
+            return None
+        filename = f'{os.path.splitext(os.path.basename(src))[0]}.{digest}.icon{size}.png'
+        self.manifest['icons'][f'{src}@{size}'] = self.url_prefix + filename
+        if os.path.exists(os.path.join(self.output_dir, filename)):
+            return self.url_prefix + filename
+        with Image.open(path) as original:
+            image = ImageOps.exif_transpose(original).convert('RGBA')
+        image.thumbnail((size, size), Image.LANCZOS)
+        canvas = Image.new('RGBA', (size, size), (0, 0, 0, 0))
+        canvas.paste(image, ((size - image.width) // 2, (size - image.height) // 2))
+        self._save(filename, 'png', canvas)
+        return self.url_prefix + filename
+
+    def _digest(self, data):
+        settings = json.dumps([ENCODERS, self.formats], sort_keys=True).encode('utf-8')
+        return hashlib.sha256(data + settings).hexdigest()[:16]
+
+    def _complete(self, entry):
+        return all(os.path.exists(os.path.join(self.output_dir, url[len(self.url_prefix):]))
+                   for variants in entry['variants'].values() for url in variants.values())
+
+    def _write(self, filename, fmt, image, width, height):
+        if os.path.exists(os.path.join(self.output_dir, filename)):
+            return  # nome com hash: o conteúdo já é o mesmo
+        resized = image if width == image.width else image.resize((width, height), Image.LANCZOS)
+        self._save(filename, fmt, resized)
+
+    def _save(self, filename, fmt, image):
+        os.makedirs(self.output_dir, exist_ok=True)
+        path = os.path.join(self.output_dir, filename)
+        image.save(path + '.tmp', format=fmt.upper(), **ENCODERS[fmt])
+        os.replace(path + '.tmp', path)
+        self.generated += 1
+
+    def build_all(self):
+        """Gera os derivados de todas as imagens de static/img."""
+        source_dir = os.path.join(self.static_folder, IMAGE_DIR)
+        processed = []
+        for dirpath, _, filenames in os.walk(source_dir):
+            for filename in sorted(filenames):
+                if os.path.splitext(filename)[1].lower() not in ('.png', '.jpg', '.jpeg'):
+                    continue
+                src = os.path.relpath(os.path.join(dirpath, filename), self.root_dir).replace(os.sep, '/')
+                if self.derivatives(src) is not None:
+                    processed.append(src)
+        return processed
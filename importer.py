@@ -0,0 +1,165 @@
+"""
+Importação em massa de alunos e matrículas a partir de CSV.
+
+Colunas: name, email, password, phone (opcional) e courses (opcional, ids
+separados por ';'). Cada linha válida cria o aluno (ou reaproveita um email já
+cadastrado) e um pedido pago 'import' por curso que ele ainda não tenha.
+
+O trabalho é feito em lotes: uma consulta por lote para achar emails já
+cadastrados, hash das senhas em paralelo no pool de processos, e inserts em
+executemany com um commit por lote.
+"""
+
+import csv
+import re
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError
+
+from models import db, User, Course, Order
+from stats import apply_deltas, add_order_delta, rollup_key
+from entitlements import mark_dirty
+
+EMAIL_RE = re.compile(r'^[^@\s]+@[^@\s]+\.[^@\s]+$')
+ERROR_COLUMNS = ['line', 'email', 'error']
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.created_users = 0
+        self.existing_users = 0
+        self.orders = 0
+        self.errors = []
+
+    def error(self, line, email, message):
+        self.errors.append({'line': line, 'email': email, 'error': message})
+
+    def to_dict(self):
+        return {
+            'rows': self.rows,
+            'created_users': self.created_users,
+            'existing_users': self.existing_users,
+            'orders': self.orders,
+            'errors': len(self.errors),
+        }
+
+
+def _validate(reader, prices, report):
+    """Valida as linhas e remove emails repetidos no próprio arquivo."""
+    seen = set()
+    for line, row in enumerate(reader, start=2):  # linha 1 é o cabeçalho
+        report.rows += 1
+        email = (row.get('email') or '').strip().lower()
+        name = (row.get('name') or '').strip()
+        password = row.get('password') or ''
+        courses = [c.strip() for c in (row.get('courses') or '').split(';') if c.strip()]
+
+        if not EMAIL_RE.match(email):
+            report.error(line, email, 'Email inválido')
+        elif email in seen:
+            report.error(line, email, 'Email repetido no arquivo')
+        elif not name:
+            report.error(line, email, 'Nome é obrigatório')
+        elif not password:
+            report.error(line, email, 'Senha é obrigatória')
+        elif any(course not in prices for course in courses):
+            unknown = ', '.join(c for c in courses if c not in prices)
+            report.error(line, email, f'Curso inexistente: {unknown}')
+        else:
+            seen.add(email)
+            yield {'line': line, 'email': email, 'name': name[:100], 'password': password,
+                   'phone': (row.get('phone') or '').strip()[:20], 'courses': courses}
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_students(lines, hasher, batch_size=1000, progress=None):
+    """
+    Importa o CSV (arquivo ou iterável de linhas). progress(report) é chamado
+    após cada lote confirmado.
+    """
+    report = ImportReport()
+    prices = dict(db.session.execute(select(Course.id, Course.price)).all())
+    valid = _validate(csv.DictReader(lines), prices, report)
+
+    for batch in _batches(valid, batch_size):
+        try:
+            created, orders = _import_batch(batch, prices, hasher)
+        except IntegrityError:
+            # Ex.: um email cadastrado pelo site enquanto o lote era processado
+            db.session.rollback()
+            for row in batch:
+                report.error(row['line'], row['email'], 'Lote rejeitado pelo banco; importe a linha novamente')
+            continue
+        report.created_users += created
+        report.existing_users += len(batch) - created
+        report.orders += orders
+        if progress:
+            progress(report)
+
+    return report
+
+
+def _import_batch(batch, prices, hasher):
+    """Grava um lote numa transação. Retorna (alunos criados, pedidos criados)."""
+    # Os emails do arquivo já vêm em minúsculas, mas o cadastro pelo site grava
+    # como digitado: a busca ignora maiúsculas para não duplicar o aluno
+    emails = [row['email'] for row in batch]
+    email_key = func.lower(User.email)
+    existing = dict(db.session.execute(
+        select(email_key, User.id).where(email_key.in_(emails))).all())
+
+    new_rows = [row for row in batch if row['email'] not in existing]
+    hashes = hasher.hash_many([row['password'] for row in new_rows])
+    now = datetime.utcnow()
+    if new_rows:
+        db.session.execute(User.__table__.insert(), [
+            {'name': row['name'], 'email': row['email'], 'password_hash': password_hash,
+             'phone': row['phone'], 'created_at': now}
+            for row, password_hash in zip(new_rows, hashes)
+        ])
+    ids = dict(db.session.execute(
+        select(email_key, User.id).where(email_key.in_(emails))).all())
+
+    # Não duplica matrícula paga de quem já estava cadastrado
+    owned = set()
+    if existing:
+        owned = set(db.session.execute(
+            select(Order.user_id, Order.course_id)
+            .where(Order.user_id.in_(existing.values()), Order.status == 'paid')).all())
+
+    orders, deltas = [], {}
+    for row in batch:
+        user_id = ids[row['email']]
+        for course_id in dict.fromkeys(row['courses']):
+            if (user_id, course_id) in owned:
+                continue
+            orders.append({'user_id': user_id, 'course_id': course_id, 'status': 'paid',
+                           'total_amount': prices[course_id], 'payment_method': 'import',
+                           'created_at': now})
+            add_order_delta(deltas, rollup_key(now, course_id, 'paid', 'import'), prices[course_id])
+    if orders:
+        db.session.execute(Order.__table__.insert(), orders)
+        # Inserts em Core não passam pelos listeners do ORM que mantêm os
+        # agregados e o cache de cursos liberados
+        apply_deltas(db.session.connection(), deltas)
+        mark_dirty(db.session, {order['user_id'] for order in orders})
+    db.session.commit()
+    return len(new_rows), len(orders)
+
+
+def write_errors(report, stream):
+    writer = csv.DictWriter(stream, fieldnames=ERROR_COLUMNS)
+    writer.writeheader()
+    writer.writerows(report.errors)
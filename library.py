@@ -0,0 +1,194 @@
+"""
+Materiais da biblioteca (PDFs e vídeos dos cursos) com Range e sendfile.
+
+Os arquivos ficam em LIBRARY_DIR, um diretório por curso:
+
+    library/terapia-capilar/apostila.pdf  ->  /api/library/terapia-capilar/apostila.pdf
+
+Só quem tem um pedido pago do curso (ou do combo que o inclui) recebe o
+arquivo (ver entitlements.py). A resposta nunca carrega o arquivo em memória:
+no serve.py o corpo vai do page cache direto para o socket com sendfile; em
+outros servidores é lido em blocos de CHUNK_SIZE. Range/206 permite pular no
+vídeo e retomar downloads, e If-Range garante que um download retomado não
+misture duas versões do arquivo.
+
+`flask library-index` grava o índice com tamanho, mtime e sha256 de cada
+arquivo; o ETag vem do hash, sem ler o arquivo a cada requisição. Um arquivo
+alterado depois do índice continua sendo servido, com ETag de mtime e tamanho,
+até o próximo `flask library-index`.
+"""
+
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+
+from flask import Response, request
+from werkzeug.security import safe_join
+
+INDEX_NAME = '.index.json'
+CHUNK_SIZE = 256 * 1024
+
+
+def build_index(root):
+    """Calcula tamanho, mtime e sha256 de todos os materiais e grava o índice."""
+    index = {}
+    for course_id in sorted(os.listdir(root)):
+        course_dir = os.path.join(root, course_id)
+        if course_id.startswith('.') or not os.path.isdir(course_dir):
+            continue
+        for dirpath, dirnames, filenames in os.walk(course_dir):
+            dirnames[:] = sorted(name for name in dirnames if not name.startswith('.'))
+            for filename in sorted(filenames):
+                if filename.startswith('.'):
+                    continue
+                path = os.path.join(dirpath, filename)
+                material = os.path.relpath(path, root).replace(os.sep, '/')
+                index[material] = _describe(path, course_id, with_hash=True)
+    tmp_path = os.path.join(root, INDEX_NAME + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, os.path.join(root, INDEX_NAME))
+    return index
+
+
+def _describe(path, course_id, with_hash=False):
+    stat = os.stat(path)
+    entry = {
+        'course_id': course_id,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'mimetype': mimetypes.guess_type(path)[0] or 'application/octet-stream',
+    }
+    if with_hash:
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        entry['sha256'] = digest.hexdigest()
+    return entry
+
+
+def etag_for(entry):
+    if 'sha256' in entry:
+        return entry['sha256'][:32]
+    return f"{entry['mtime_ns']:x}-{entry['size']:x}"
+
+
+class FileSegment:
+    """Corpo da resposta: `length` bytes de `file` a partir de `offset`."""
+
+    def __init__(self, file, offset, length, sendfile=None):
+        self.file = file
+        self.offset = offset
+        self.length = length
+        self.sendfile = sendfile
+
+    def __iter__(self):
+        if self.sendfile is not None and self.length:
+            # O servidor do werkzeug envia os cabeçalhos no primeiro bloco, mesmo
+            # vazio; depois disso o socket é só do corpo
+            yield b''
+            self.sendfile(self.file, self.offset, self.length)
+            return
+        fd = self.file.fileno()
+        offset, remaining = self.offset, self.length
+        while remaining > 0:
+            # pread não mexe na posição do arquivo nem passa pelo buffer do Python
+            chunk = os.pread(fd, min(CHUNK_SIZE, remaining), offset)
+            if not chunk:
+                break  # arquivo encurtado durante o envio
+            offset += len(chunk)
+            remaining -= len(chunk)
+            yield chunk
+
+    def close(self):
+        self.file.close()
+
+
+class Library:
+    def __init__(self, root):
+        self.root = root
+        self._index = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self):
+        if self._index is None:
+            with self._lock:
+                if self._index is None:
+                    try:
+                        with open(os.path.join(self.root, INDEX_NAME), encoding='utf-8') as f:
+                            self._index = json.load(f)
+                    except FileNotFoundError:
+                        self._index = {}
+        return self._index
+
+    def reload(self):
+        self._index = None
+
+    def lookup(self, material):
+        """(caminho, metadados) do material, ou None se ele não existe."""
+        course_id, _, name = material.partition('/')
+        if not name or course_id.startswith('.') or any(part.startswith('.') for part in name.split('/')):
+            return None
+        path = safe_join(self.root, material)
+        if path is None:
+            return None
+        try:
+            stat = os.stat(path)
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        entry = self.index.get(material)
+        if entry is None or entry['size'] != stat.st_size or entry['mtime_ns'] != stat.st_mtime_ns:
+            # Fora do índice ou alterado depois dele: ETag de mtime e tamanho
+            entry = _describe(path, course_id)
+        return path, entry
+
+    def serve(self, path, entry, download=False):
+        """Resposta com o arquivo inteiro, um trecho (206), 304 ou 416."""
+        size = entry['size']
+        etag = etag_for(entry)
+        response = Response(mimetype=entry['mimetype'], direct_passthrough=True)
+        response.set_etag(etag)
+        response.last_modified = entry['mtime_ns'] / 1e9
+        response.accept_ranges = 'bytes'
+        # Material pago: só o navegador do aluno guarda, e revalida pelo ETag
+        response.cache_control.private = True
+        response.cache_control.no_cache = True
+        if download:
+            response.headers.set('Content-Disposition', 'attachment', filename=os.path.basename(path))
+
+        start, length = 0, size
+        byte_range = request.range if self._range_applies(etag, entry) else None
+        # Vários intervalos no mesmo pedido (multipart) não são suportados: vai o arquivo inteiro
+        if byte_range is not None and byte_range.units == 'bytes' and len(byte_range.ranges) == 1:
+            bounds = byte_range.range_for_length(size)
+            if bounds is None:
+                response.status_code = 416
+                response.headers['Content-Range'] = f'bytes */{size}'
+                response.content_length = 0
+                return response
+            start, stop = bounds
+            length = stop - start
+            response.status_code = 206
+            response.headers['Content-Range'] = byte_range.to_content_range_header(size)
+        elif request.if_none_match.contains_weak(etag):
+            response.status_code = 304
+            return response
+
+        response.content_length = length
+        response.response = FileSegment(open(path, 'rb'), start, length,
+                                        sendfile=request.environ.get('agape.sendfile'))
+        return response
+
+    def _range_applies(self, etag, entry):
+        # Com If-Range, o trecho só vale se o arquivo ainda for a versão que o
+        # cliente tem; senão vai o arquivo novo inteiro
+        if_range = request.if_range
+        if if_range.etag is not None:
+            return if_range.etag == etag
+        if if_range.date is not None:
+            return int(entry['mtime_ns'] / 1e9) <= if_range.date.timestamp()
+        return True
@@ -0,0 +1,309 @@
+"""
+Métricas de requisições e do banco no formato texto do Prometheus (/metrics).
+
+Por endpoint: histograma de latência, contagem por status e requisições em
+andamento. Eventos do engine contam as consultas e o tempo de banco de cada
+requisição, e consultas acima de SLOW_QUERY_MS vão para o log. O tempo de cada
+requisição é dividido em fases (db, template, password_hash...), o que mostra
+se um checkout lento está no hash, no banco (inclusive esperando o lock do
+SQLite) ou na renderização.
+
+Tudo fica em memória, por processo, com custo de um lock e um bisect por
+observação. Consultas feitas fora de requisições (threads de pedidos e de
+webhooks) aparecem com endpoint "(background)".
+
+Com o serve.py cada worker tem o seu registro, e o /metrics é atendido por um
+worker qualquer. Com `shared_dir` (METRICS_DIR, que o serve.py define) cada
+worker grava as suas amostras em <pid>.json a cada `dump_interval` segundos e
+o /metrics soma os arquivos de todos os workers: o total é do servidor, com
+atraso de até `dump_interval` para os outros workers. Contadores e histogramas
+de workers que já saíram continuam na soma, para não voltarem atrás; gauges só
+contam de workers vivos.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from flask import Response, g, request, before_render_template, template_rendered
+from sqlalchemy import event
+
+from background import BackgroundThread
+from models import db
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 500)
+BACKGROUND = '(background)'
+UNMATCHED = '(unmatched)'
+
+_current = threading.local()
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for labels, value in sorted(values.items()):
+            yield self.name + _labels(self.label_names, labels), value
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.label_names = labels
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, labels, value):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                # contagem por bucket (o último é +Inf), soma, total
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            snapshot = {labels: (list(counts), total, count)
+                        for labels, (counts, total, count) in self._series.items()}
+        for labels, (counts, total, count) in sorted(snapshot.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                yield self.name + '_bucket' + _labels(self.label_names, labels, [('le', _number(bound))]), cumulative
+            yield self.name + '_sum' + _labels(self.label_names, labels), total
+            yield self.name + '_count' + _labels(self.label_names, labels), count
+
+
+class RequestMetrics:
+    def __init__(self, slow_query_ms=200, shared_dir=None, dump_interval=5):
+        self.slow_query = slow_query_ms / 1000
+        self.shared_dir = shared_dir
+        self.dump_interval = dump_interval
+        self._dumper = BackgroundThread('metrics-dump', self._dump_loop) if shared_dir else None
+        self.requests = Counter('http_requests_total', 'Requisições por endpoint, método e status.',
+                                ('endpoint', 'method', 'status'))
+        self.latency = Histogram('http_request_duration_seconds', 'Latência das requisições.',
+                                 ('endpoint', 'method'))
+        self.in_flight = Gauge('http_requests_in_flight', 'Requisições em andamento.', ('endpoint',))
+        self.phases = Histogram('http_request_phase_seconds', 'Tempo de cada fase dentro da requisição.',
+                                ('endpoint', 'phase'))
+        self.queries = Counter('db_queries_total', 'Consultas ao banco.', ('endpoint',))
+        self.query_latency = Histogram('db_query_duration_seconds', 'Duração de cada consulta.',
+                                       ('endpoint',), QUERY_BUCKETS)
+        self.queries_per_request = Histogram('db_queries_per_request', 'Consultas por requisição.',
+                                             ('endpoint',), COUNT_BUCKETS)
+        self.slow_queries = Counter('db_slow_queries_total', 'Consultas acima de SLOW_QUERY_MS.', ('endpoint',))
+        self.registry = [self.requests, self.latency, self.in_flight, self.phases,
+                         self.queries, self.query_latency, self.queries_per_request, self.slow_queries]
+        self.app = None
+
+    def register(self, metric):
+        """Inclui uma métrica de outro módulo na saída de /metrics."""
+        self.registry.append(metric)
+        return metric
+
+    def init_app(self, app):
+        self.app = app
+        if self.shared_dir:
+            os.makedirs(self.shared_dir, exist_ok=True)
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        app.teardown_request(self._teardown_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        with app.app_context():
+            event.listen(db.engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(db.engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    # --- Requisições ---
+
+    def _before_request(self):
+        if self._dumper is not None:
+            self._dumper.ensure_started()
+        endpoint = request.endpoint or UNMATCHED
+        _current.state = {'endpoint': endpoint, 'queries': 0, 'phases': {}}
+        g.metrics_start = time.perf_counter()
+        self.in_flight.inc((endpoint,))
+
+    def _after_request(self, response):
+        state = getattr(_current, 'state', None)
+        if state is not None:
+            state['status'] = response.status_code
+        return response
+
+    def _teardown_request(self, error=None):
+        state = getattr(_current, 'state', None)
+        if state is None:
+            return
+        _current.state = None
+        endpoint = state['endpoint']
+        elapsed = time.perf_counter() - g.metrics_start
+        # Exceção não tratada vira 500
+        status = state.get('status', 500)
+        self.in_flight.dec((endpoint,))
+        self.requests.inc((endpoint, request.method, str(status)))
+        self.latency.observe((endpoint, request.method), elapsed)
+        self.queries_per_request.observe((endpoint,), state['queries'])
+        for phase, seconds in state['phases'].items():
+            self.phases.observe((endpoint, phase), seconds)
+
+    @contextmanager
+    def phase(self, name):
+        """Soma o tempo do bloco na fase `name` da requisição atual."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._add_phase(name, time.perf_counter() - start)
+
+    def _add_phase(self, name, seconds):
+        state = getattr(_current, 'state', None)
+        if state is not None:
+            state['phases'][name] = state['phases'].get(name, 0.0) + seconds
+
+    def _before_render(self, sender, template, context, **extra):
+        _current.render_start = time.perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        start = getattr(_current, 'render_start', None)
+        if start is not None:
+            self._add_phase('template', time.perf_counter() - start)
+
+    # --- Banco ---
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        # Fica no contexto da execução, não na conexão: quando o comando falha o
+        # after não roda, e nada pode sobrar na conexão que volta ao pool
+        if context is not None:
+            context.metrics_start = time.perf_counter()
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start = getattr(context, 'metrics_start', None)
+        if start is None:
+            return
+        elapsed = time.perf_counter() - start
+        state = getattr(_current, 'state', None)
+        endpoint = state['endpoint'] if state is not None else BACKGROUND
+        if state is not None:
+            state['queries'] += 1
+            state['phases']['db'] = state['phases'].get('db', 0.0) + elapsed
+        self.queries.inc((endpoint,))
+        self.query_latency.observe((endpoint,), elapsed)
+        if elapsed >= self.slow_query:
+            self.slow_queries.inc((endpoint,))
+            self.app.logger.warning('Consulta lenta (%.0f ms) em %s: %s', elapsed * 1000, endpoint,
+                                    ' '.join(statement.split())[:500])
+
+    # --- Exposição ---
+
+    def render(self):
+        merged = self._collect() if self.shared_dir else None
+        lines = []
+        for metric in self.registry:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            samples = merged.get(metric.name, {}).items() if merged is not None else metric.samples()
+            lines.extend(f'{name} {_number(value)}' for name, value in samples)
+        return '\n'.join(lines) + '\n'
+
+    # --- Soma entre workers ---
+
+    def _dump_loop(self):
+        while True:
+            time.sleep(self.dump_interval)
+            try:
+                self._dump()
+            except Exception:
+                self.app.logger.exception('Falha ao gravar as métricas em %s', self.shared_dir)
+
+    def _dump(self):
+        snapshot = {metric.name: list(metric.samples()) for metric in self.registry}
+        path = os.path.join(self.shared_dir, f'{os.getpid()}.json')
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(snapshot, f)
+        os.replace(path + '.tmp', path)
+
+    def _collect(self):
+        """Amostras somadas de todos os workers: {métrica: {amostra: valor}}."""
+        self._dump()  # as deste worker, atualizadas
+        kinds = {metric.name: metric.kind for metric in self.registry}
+        merged = {}
+        for filename in sorted(os.listdir(self.shared_dir)):
+            pid, _, extension = filename.partition('.')
+            if extension != 'json' or not pid.isdigit():
+                continue
+            try:
+                with open(os.path.join(self.shared_dir, filename), encoding='utf-8') as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            alive = _alive(int(pid))
+            for name, samples in snapshot.items():
+                if name not in kinds or (kinds[name] == 'gauge' and not alive):
+                    continue
+                series = merged.setdefault(name, {})
+                for sample, value in samples:
+                    series[sample] = series.get(sample, 0) + value
+        return merged
+
+    def response(self):
+        return Response(self.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
@@ -4,11 +4,15 @@ from datetime import datetime
 db = SQLAlchemy()
 
 class User(db.Model):
+    # Paginação por cursor da listagem de alunos (ver students.py)
+    __table_args__ = (db.Index('ix_user_created_at_id', 'created_at', 'id'),)
+
     id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
+    name = db.Column(db.String(100), nullable=False, index=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(256), nullable=False)
     phone = db.Column(db.String(20))
+    gateway_customer_id = db.Column(db.String(64)) # id do cliente no Asaas, salvo na primeira compra
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
     # Relação com pedidos
@@ -22,20 +26,37 @@ class User(db.Model):
             'phone': self.phone
         }
 
+# O cadastro grava o email como digitado; a importação procura sem diferenciar
+# maiúsculas (ver importer.py)
+db.Index('ix_user_email_lower', db.func.lower(User.email))
+
 class Course(db.Model):
     id = db.Column(db.String(50), primary_key=True) # ex: 'terapia-capilar', 'combo'
     name = db.Column(db.String(100), nullable=False)
     price = db.Column(db.Float, nullable=False)
     description = db.Column(db.String(200))
 
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'title': self.name, # mesmo campo que o front usa no catálogo do Supabase
+            'price': self.price,
+            'description': self.description
+        }
+
 class Order(db.Model):
+    # Cursos pagos de um aluno respondidos só pelo índice (ver entitlements.py)
+    __table_args__ = (db.Index('ix_order_user_status', 'user_id', 'status', 'course_id'),)
+
     id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     course_id = db.Column(db.String(50), db.ForeignKey('course.id'), nullable=False)
-    status = db.Column(db.String(20), default='pending') # pending, paid
+    status = db.Column(db.String(20), default='pending', index=True) # pending, paid
     total_amount = db.Column(db.Float, nullable=False)
     payment_method = db.Column(db.String(20)) # pix, credit_card, boleto
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    payment_id = db.Column(db.String(64), index=True) # id da cobrança no gateway (Asaas)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
     def to_dict(self):
         return {
@@ -45,3 +66,102 @@ class Order(db.Model):
             'total_amount': self.total_amount,
             'date': self.created_at.isoformat()
         }
+
+class IdempotencyKey(db.Model):
+    # Chave enviada pelo cliente no header Idempotency-Key do checkout
+    key = db.Column(db.String(64), primary_key=True)
+    order_id = db.Column(db.Integer, db.ForeignKey('order.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    order = db.relationship('Order')
+
+class OrderDailyRollup(db.Model):
+    # Agregado diário dos pedidos, mantido de forma incremental (ver stats.py)
+    day = db.Column(db.Date, primary_key=True)
+    course_id = db.Column(db.String(50), primary_key=True)
+    status = db.Column(db.String(20), primary_key=True)
+    payment_method = db.Column(db.String(20), primary_key=True) # '' quando o pedido não tem
+    order_count = db.Column(db.Integer, nullable=False, default=0)
+    revenue = db.Column(db.Float, nullable=False, default=0.0)
+
+class PaymentEvent(db.Model):
+    # Outbox dos webhooks do gateway, aplicada em ordem de chegada (ver webhooks.py)
+    __table_args__ = (db.Index('ix_payment_event_pending', 'processed_at', 'seq'),)
+
+    seq = db.Column(db.Integer, primary_key=True)
+    event_id = db.Column(db.String(100), unique=True, nullable=False)
+    event = db.Column(db.String(50), nullable=False) # ex: PAYMENT_RECEIVED
+    payment_id = db.Column(db.String(64), nullable=False)
+    external_reference = db.Column(db.String(100))
+    status = db.Column(db.String(20), nullable=False) # paid, failed, refunded
+    received_at = db.Column(db.DateTime, default=datetime.utcnow)
+    processed_at = db.Column(db.DateTime)
+    result = db.Column(db.String(20)) # applied, unchanged, rejected, order_not_found
+
+class LessonProgress(db.Model):
+    # Última posição de cada aluno em cada aula, gravada em lote (ver progress.py)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    course_id = db.Column(db.String(50), db.ForeignKey('course.id'), primary_key=True)
+    lesson_id = db.Column(db.String(100), primary_key=True)
+    position_seconds = db.Column(db.Float, nullable=False, default=0.0)
+    duration_seconds = db.Column(db.Float)
+    completed = db.Column(db.Boolean, nullable=False, default=False) # não volta a False
+    updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'course_id': self.course_id,
+            'lesson_id': self.lesson_id,
+            'position': self.position_seconds,
+            'duration': self.duration_seconds,
+            'completed': self.completed,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class Availability(db.Model):
+    # Janelas semanais de atendimento da Vera; os horários livres saem daqui (ver slots.py)
+    id = db.Column(db.Integer, primary_key=True)
+    weekday = db.Column(db.Integer, nullable=False) # 0 = segunda ... 6 = domingo
+    start_time = db.Column(db.Time, nullable=False)
+    end_time = db.Column(db.Time, nullable=False)
+    slot_minutes = db.Column(db.Integer, nullable=False, default=60)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'weekday': self.weekday,
+            'start': self.start_time.strftime('%H:%M'),
+            'end': self.end_time.strftime('%H:%M'),
+            'slot_minutes': self.slot_minutes
+        }
+
+class Booking(db.Model):
+    # Uma sessão confirmada por início: o índice único parcial faz a segunda
+    # reserva concorrente falhar no INSERT; sobreposições são conferidas em slots.py
+    __table_args__ = (db.Index('uq_booking_confirmed_start', 'starts_at', unique=True,
+                               sqlite_where=db.text("status = 'confirmed'"),
+                               postgresql_where=db.text("status = 'confirmed'")),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    starts_at = db.Column(db.DateTime, nullable=False) # horário local da agenda
+    ends_at = db.Column(db.DateTime, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(120), nullable=False)
+    phone = db.Column(db.String(20))
+    message = db.Column(db.Text)
+    status = db.Column(db.String(20), nullable=False, default='confirmed') # confirmed, cancelled
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    cancelled_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'start': self.starts_at.isoformat(timespec='minutes'),
+            'end': self.ends_at.isoformat(timespec='minutes'),
+            'name': self.name,
+            'email': self.email,
+            'phone': self.phone,
+            'message': self.message,
+            'status': self.status
+        }
@@ -0,0 +1,131 @@
+"""
+Escrita de pedidos com commit em grupo e idempotência.
+
+No SQLite cada commit disputa o lock de escrita do arquivo; em picos de
+checkout isso gera "database is locked". Aqui uma única thread por processo
+drena a fila de pedidos e grava vários numa só transação. Cada chamador
+continua recebendo o próprio pedido de forma síncrona.
+"""
+
+import queue
+import time
+from concurrent.futures import Future, TimeoutError
+
+from background import BackgroundThread
+from models import db, Order, IdempotencyKey
+
+
+class IdempotencyConflict(Exception):
+    """A chave já foi usada para um pedido com outro usuário ou curso."""
+
+
+class OrderQueueTimeout(Exception):
+    """O pedido não foi gravado dentro do timeout; o chamador deve responder 503."""
+
+
+class _PendingOrder:
+    __slots__ = ('fields', 'key', 'future')
+
+    def __init__(self, fields, key):
+        self.fields = fields
+        self.key = key
+        self.future = Future()
+
+
+class OrderWriter:
+    def __init__(self, app=None, batch_size=64, max_delay=0.005, timeout=10):
+        self.app = app
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.timeout = timeout
+        self._queue = queue.Queue()
+        self._worker = BackgroundThread('order-writer', self._run, on_fork=self._reset)
+
+    def submit(self, fields, idempotency_key=None):
+        """
+        Enfileira um pedido e espera o commit do grupo.
+        Retorna (order_dict, created); created=False indica repetição da chave.
+        """
+        self._worker.ensure_started()
+        pending = _PendingOrder(fields, idempotency_key)
+        self._queue.put(pending)
+        try:
+            return pending.future.result(timeout=self.timeout)
+        except TimeoutError:
+            # Ainda na fila: cancela e o pedido não é gravado. Se a gravação já
+            # começou, repetir com a mesma Idempotency-Key devolve o pedido
+            pending.future.cancel()
+            raise OrderQueueTimeout()
+
+    def _reset(self):
+        self._queue = queue.Queue()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            # Descarta os que o chamador já cancelou; os demais não podem mais ser cancelados
+            batch = [pending for pending in batch if pending.future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            with self.app.app_context():
+                self._write(batch)
+
+    def _write(self, batch):
+        try:
+            self._commit(batch)
+            return
+        except Exception:
+            db.session.rollback()
+        # Um pedido inválido não pode derrubar o grupo inteiro, e uma chave
+        # gravada por outro processo entre a consulta e o commit só é vista
+        # numa nova tentativa: refaz um a um
+        for pending in batch:
+            try:
+                self._commit([pending])
+            except Exception as error:
+                db.session.rollback()
+                pending.future.set_exception(error)
+
+    def _commit(self, batch):
+        keys = {p.key for p in batch if p.key}
+        existing = {}
+        if keys:
+            existing = {k.key: k.order for k in IdempotencyKey.query.filter(IdempotencyKey.key.in_(keys))}
+
+        results = []
+        new_by_key = {}
+        for pending in batch:
+            order = existing.get(pending.key) or new_by_key.get(pending.key)
+            if order is not None:
+                results.append((pending, order, False))
+                continue
+            order = Order(**pending.fields)
+            db.session.add(order)
+            if pending.key:
+                db.session.add(IdempotencyKey(key=pending.key, order=order))
+                new_by_key[pending.key] = order
+            results.append((pending, order, True))
+
+        # Serializa antes do commit para não recarregar cada pedido expirado
+        db.session.flush()
+        payloads = [(pending, order.to_dict(), order.user_id, order.course_id, created)
+                    for pending, order, created in results]
+        db.session.commit()
+
+        for pending, payload, user_id, course_id, created in payloads:
+            if pending.future.done():
+                continue
+            if not created and (str(user_id) != str(pending.fields.get('user_id'))
+                                or course_id != pending.fields.get('course_id')):
+                pending.future.set_exception(IdempotencyConflict())
+            else:
+                pending.future.set_result((payload, created))
@@ -0,0 +1,137 @@
+"""
+Páginas HTML pré-renderizadas e pré-comprimidas.
+
+As páginas do site são documentos estáticos de 25–40 KB; renderizar cada uma
+a cada acesso é desperdício. `flask build-pages` renderiza todas uma vez e
+grava variantes identity/gzip/brotli com o hash do conteúdo no nome. Em
+produção o app só escolhe a variante e entrega o arquivo (sendfile).
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+
+from flask import render_template, request, send_file
+
+try:
+    import brotli
+except ImportError:  # brotli é opcional: sem ele só há gzip
+    brotli = None
+
+MANIFEST_NAME = 'manifest.json'
+
+# Ordem de preferência quando o cliente aceita mais de uma
+ENCODINGS = ('br', 'gzip')
+
+
+def list_pages(app):
+    """Páginas .html de primeiro nível da pasta de templates do app."""
+    # Só o primeiro nível: a pasta é a raiz do projeto, com static/ e build/ dentro
+    template_dir = os.path.join(app.root_path, app.template_folder)
+    return sorted(name for name in os.listdir(template_dir)
+                  if name.endswith('.html') and os.path.isfile(os.path.join(template_dir, name)))
+
+
+def build_pages(app, output_dir, bundler=None, images=None):
+    """
+    Renderiza todas as páginas e grava as variantes. Retorna o manifesto.
+    Com um AssetBundler, os scripts e estilos locais viram bundles com hash;
+    com um ImageBuilder, as imagens locais ganham srcset e derivados.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {}
+    built_at = time.time()
+    for name in list_pages(app):
+        with app.test_request_context('/' + name):
+            html = render_template(name)
+        if bundler is not None:
+            html = bundler.rewrite(name, html)
+        if images is not None:
+            html = images.rewrite(name, html)
+        body = html.encode('utf-8')
+        digest = hashlib.sha256(body).hexdigest()[:16]
+        stem = f'{name[:-5]}.{digest}.html'
+        variants = {'identity': stem}
+        _write(output_dir, stem, body)
+        # mtime=0 deixa o .gz reproduzível entre builds
+        _write(output_dir, stem + '.gz', gzip.compress(body, compresslevel=9, mtime=0))
+        variants['gzip'] = stem + '.gz'
+        if brotli is not None:
+            _write(output_dir, stem + '.br', brotli.compress(body, mode=brotli.MODE_TEXT, quality=11))
+            variants['br'] = stem + '.br'
+        manifest[name] = {'hash': digest, 'size': len(body), 'built_at': built_at, 'variants': variants}
+
+    if bundler is not None:
+        bundler.write_manifest()
+    if images is not None:
+        images.write_manifest()
+    # O manifesto muda a cada build, então é sempre regravado
+    with open(os.path.join(output_dir, MANIFEST_NAME), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    return manifest
+
+
+def _write(output_dir, filename, data):
+    path = os.path.join(output_dir, filename)
+    if os.path.exists(path):
+        return  # nome com hash: o conteúdo já é o mesmo
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+class PageStore:
+    """Entrega as páginas geradas por build_pages."""
+
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self._manifest = None
+        self._lock = threading.Lock()
+
+    @property
+    def manifest(self):
+        if self._manifest is None:
+            with self._lock:
+                if self._manifest is None:
+                    path = os.path.join(self.output_dir, MANIFEST_NAME)
+                    try:
+                        with open(path, encoding='utf-8') as f:
+                            self._manifest = json.load(f)
+                    except FileNotFoundError:
+                        self._manifest = {}
+        return self._manifest
+
+    def reload(self):
+        self._manifest = None
+
+    def serve(self, name):
+        """Resposta da página pré-renderizada, ou None se ela não foi gerada."""
+        entry = self.manifest.get(name)
+        if entry is None:
+            return None
+
+        encoding = 'identity'
+        for candidate in ENCODINGS:
+            if candidate in entry['variants'] and request.accept_encodings[candidate] > 0:
+                encoding = candidate
+                break
+
+        path = os.path.join(self.output_dir, entry['variants'][encoding])
+        response = send_file(
+            path,
+            mimetype='text/html',
+            etag=f"{entry['hash']}-{encoding}",
+            last_modified=entry['built_at'],
+            conditional=True,
+        )
+        response.headers.pop('Content-Disposition', None)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        response.vary.add('Accept-Encoding')
+        response.cache_control.public = True
+        response.cache_control.no_cache = True
+        return response
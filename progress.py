@@ -0,0 +1,147 @@
+"""
+Progresso das aulas a partir dos heartbeats do player.
+
+O player envia a posição da aula a cada poucos segundos. Com milhares de alunos
+assistindo ao mesmo tempo, um commit por heartbeat seriam milhares de
+transações por segundo disputando o lock de escrita do SQLite. Aqui cada
+processo guarda em memória só o último heartbeat de cada (aluno, curso, aula)
+e uma thread grava o buffer inteiro num único upsert em lote a cada
+flush_interval segundos, ou antes, quando ele passa de max_pending aulas.
+
+Entre dois flushes o progresso só existe no buffer: se o processo morrer sem
+o flush final (shutdown() em app.py), perde-se no máximo flush_interval
+segundos de posição. Com vários workers, cada um tem o próprio buffer e o
+upsert só sobrescreve uma linha com um heartbeat mais recente.
+"""
+
+import threading
+from datetime import datetime
+
+from sqlalchemy import func, or_
+
+from background import BackgroundThread
+from database import upsert_insert
+from metrics import Counter
+from models import db, LessonProgress
+
+PROGRESS_TABLE = LessonProgress.__table__
+
+# A partir desta fração da duração a aula conta como concluída
+COMPLETED_RATIO = 0.9
+
+
+def write_progress(rows):
+    """Upsert de várias linhas de progresso numa única transação."""
+    connection = db.session.connection()
+    insert = upsert_insert(connection, PROGRESS_TABLE)
+    stmt = insert.on_conflict_do_update(
+        index_elements=['user_id', 'course_id', 'lesson_id'],
+        set_={
+            'position_seconds': insert.excluded.position_seconds,
+            'duration_seconds': func.coalesce(insert.excluded.duration_seconds, PROGRESS_TABLE.c.duration_seconds),
+            # Concluída uma vez, continua concluída mesmo se o aluno voltar ao início
+            'completed': or_(PROGRESS_TABLE.c.completed, insert.excluded.completed),
+            'updated_at': insert.excluded.updated_at,
+        },
+        # Outro worker pode ter gravado um heartbeat mais novo da mesma aula
+        where=PROGRESS_TABLE.c.updated_at <= insert.excluded.updated_at,
+    )
+    connection.execute(stmt, rows)
+    db.session.commit()
+
+
+class ProgressBuffer:
+    def __init__(self, app=None, max_pending=5000, flush_interval=2.0, metrics=None):
+        self.app = app
+        self.max_pending = max_pending
+        self.flush_interval = flush_interval
+        # (user_id, course_id) -> {lesson_id: linha}, para a leitura do curso não varrer o buffer
+        self._pending = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._worker = BackgroundThread('lesson-progress', self._run, on_fork=self._reset)
+        self.heartbeats = Counter('progress_heartbeats_total', 'Heartbeats de progresso recebidos.')
+        self.rows_written = Counter('progress_rows_written_total', 'Linhas de progresso gravadas no banco.')
+        self.flushes = Counter('progress_flushes_total', 'Gravações do buffer de progresso.', ('result',))
+        if metrics is not None:
+            for metric in (self.heartbeats, self.rows_written, self.flushes):
+                metrics.register(metric)
+
+    def record(self, user_id, course_id, lesson_id, position, duration=None):
+        """Guarda a posição atual da aula; substitui o heartbeat anterior, se houver."""
+        self._worker.ensure_started()
+        completed = bool(duration) and position >= duration * COMPLETED_RATIO
+        row = {
+            'user_id': user_id, 'course_id': course_id, 'lesson_id': lesson_id,
+            'position_seconds': position, 'duration_seconds': duration,
+            'completed': completed, 'updated_at': datetime.utcnow(),
+        }
+        with self._lock:
+            lessons = self._pending.setdefault((user_id, course_id), {})
+            previous = lessons.get(lesson_id)
+            if previous is None:
+                self._size += 1
+            elif previous['completed']:
+                row['completed'] = True
+            lessons[lesson_id] = row
+            full = self._size >= self.max_pending
+        self.heartbeats.inc()
+        if full:
+            self._wakeup.set()
+        return row
+
+    def pending(self, user_id, course_id):
+        """Linhas ainda não gravadas do curso, por lesson_id."""
+        with self._lock:
+            return dict(self._pending.get((user_id, course_id), {}))
+
+    def flush(self):
+        """Grava tudo o que está no buffer. Retorna o número de linhas gravadas."""
+        with self._flush_lock:
+            with self._lock:
+                batches, self._pending, self._size = self._pending, {}, 0
+            rows = [row for lessons in batches.values() for row in lessons.values()]
+            if not rows:
+                return 0
+            with self.app.app_context():
+                try:
+                    write_progress(rows)
+                    self.flushes.inc(('ok',))
+                    written = len(rows)
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.exception('Falha ao gravar %d linhas de progresso; tentando uma a uma', len(rows))
+                    self.flushes.inc(('error',))
+                    written = self._write_each(rows)
+            self.rows_written.inc(amount=written)
+            return written
+
+    def _write_each(self, rows):
+        # Uma linha inválida (aluno inexistente, por exemplo) não derruba o lote inteiro
+        written = 0
+        for row in rows:
+            try:
+                write_progress([row])
+                written += 1
+            except Exception:
+                db.session.rollback()
+                self.app.logger.warning('Progresso descartado: aluno %s, curso %s, aula %s',
+                                        row['user_id'], row['course_id'], row['lesson_id'])
+        return written
+
+    def _reset(self):
+        # O buffer herdado continua sendo gravado pelo processo pai
+        with self._lock:
+            self._pending, self._size = {}, 0
+        self._wakeup = threading.Event()
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception:
+                self.app.logger.exception('Falha no flush do progresso das aulas')
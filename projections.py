@@ -0,0 +1,100 @@
+"""
+Projeções de leitura e JSON rápido para as listagens.
+
+User.to_dict()/Order.to_dict() exigem carregar a entidade inteira no ORM (com
+identity map e rastreamento de mudanças) e depois passar pelo jsonify. Para um
+registro tudo bem; para listas de milhares, a maior parte do tempo vai nisso.
+Uma Projection seleciona só as colunas que a resposta usa e devolve dicts
+simples, direto das linhas do Core. A serialização usa o orjson quando está
+instalado, e stream_array escreve arrays grandes em pedaços, sem montar a
+resposta inteira em memória.
+
+Os dicts têm as mesmas chaves e valores do to_dict correspondente.
+"""
+
+import json
+from datetime import date, datetime
+
+from flask import Response
+from sqlalchemy import select
+
+from models import db, User, Course, Order
+
+try:
+    import orjson
+except ImportError:  # orjson é opcional: sem ele usa o json da biblioteca padrão
+    orjson = None
+
+BATCH_SIZE = 1000
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f'{type(value).__name__} não é serializável em JSON')
+
+
+def dumps(payload):
+    """JSON compacto em bytes; datas no formato isoformat(), como nos to_dict."""
+    if orjson is not None:
+        return orjson.dumps(payload)
+    return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=_default).encode('utf-8')
+
+
+def json_response(payload, status=200):
+    return Response(dumps(payload), status=status, mimetype='application/json')
+
+
+def stream_array(rows, prefix=b'', suffix=b''):
+    """Array JSON em pedaços de BATCH_SIZE itens, entre prefix e suffix."""
+    yield prefix + b'['
+    separator = b''
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            # dumps da lista sem os colchetes: um pedaço do array
+            yield separator + dumps(batch)[1:-1]
+            separator = b','
+            batch = []
+    if batch:
+        yield separator + dumps(batch)[1:-1]
+    yield b']' + suffix
+
+
+class Projection:
+    """Chave de saída -> coluna (ou expressão) a selecionar."""
+
+    def __init__(self, **fields):
+        self.fields = fields
+        self.keys = tuple(fields)
+
+    def select(self):
+        return select(*(column.label(key) for key, column in self.fields.items()))
+
+    def all(self, stmt):
+        """Lista de dicts das linhas de stmt."""
+        keys = self.keys
+        return [dict(zip(keys, row)) for row in db.session.execute(stmt)]
+
+    def iter(self, stmt):
+        """Dicts em lotes (cursor do lado do servidor no Postgres), para streaming."""
+        keys = self.keys
+        result = db.session.execute(stmt.execution_options(yield_per=BATCH_SIZE))
+        try:
+            for row in result:
+                yield dict(zip(keys, row))
+        finally:
+            result.close()
+
+
+# Mesmas chaves de User.to_dict() e Order.to_dict()
+USER = Projection(id=User.id, name=User.name, email=User.email, phone=User.phone)
+ORDER = Projection(id=Order.id, course_id=Order.course_id, status=Order.status,
+                   total_amount=Order.total_amount, date=Order.created_at)
+
+# Listagem de pedidos do painel, com aluno e curso
+ADMIN_ORDER = Projection(id=Order.id, date=Order.created_at, status=Order.status,
+                         total_amount=Order.total_amount, payment_method=Order.payment_method,
+                         course_id=Order.course_id, course_name=Course.name,
+                         user_id=Order.user_id, user_name=User.name, user_email=User.email)
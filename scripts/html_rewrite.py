@@ -0,0 +1,220 @@
+#!/usr/bin/env python3
+"""
+Motor único de reescrita das páginas HTML.
+
+Cada script de manutenção (update_pages, update_branding, padronizar_header,
+remove_psicanalise) declara um RULESET com suas regras. O motor:
+
+- compila os padrões uma única vez;
+- aplica todas as regras selecionadas numa só passada por arquivo (uma leitura
+  e no máximo uma escrita);
+- processa os arquivos em paralelo num pool de processos;
+- pula arquivos que não mudaram desde a última execução com as mesmas regras;
+- com --dry-run, só mostra o diff.
+
+Uso:
+    python scripts/html_rewrite.py --rules branding header
+    python scripts/html_rewrite.py --rules psicanalise --dry-run
+"""
+
+import argparse
+import difflib
+import hashlib
+import importlib
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+SCRIPTS_DIR = Path(__file__).resolve().parent
+PROJECT_DIR = SCRIPTS_DIR.parent
+CACHE_FILE = SCRIPTS_DIR / '.html_rewrite_cache.json'
+
+# Nome da regra na linha de comando -> módulo que define o RULESET
+RULESET_MODULES = {
+    'pages': 'update_pages',
+    'header': 'padronizar_header',
+    'branding': 'update_branding',
+    'psicanalise': 'remove_psicanalise',
+}
+
+
+class Rule:
+    """
+    Uma substituição por regex.
+
+    pages/exclude limitam os arquivos onde a regra vale; when(content) decide,
+    com o conteúdo já transformado pelas regras anteriores, se ela é aplicada.
+    """
+
+    def __init__(self, pattern, replacement, flags=0, count=0, pages=None, exclude=None, when=None, name=None):
+        self.regex = re.compile(pattern, flags)
+        self.replacement = replacement
+        self.count = count
+        self.pages = set(pages) if pages else None
+        self.exclude = set(exclude) if exclude else set()
+        self.when = when
+        self.name = name
+
+    def applies_to(self, filename):
+        if filename in self.exclude:
+            return False
+        return self.pages is None or filename in self.pages
+
+    def apply(self, content):
+        if self.when is not None and not self.when(content):
+            return content
+        return self.regex.sub(self.replacement, content, count=self.count)
+
+    def signature(self):
+        replacement = self.replacement
+        if callable(replacement):
+            replacement = replacement.__qualname__
+        when = ''
+        if self.when is not None:
+            when = self.when.__code__.co_code.hex() + repr(self.when.__code__.co_consts)
+        return repr((self.regex.pattern, self.regex.flags, replacement, self.count,
+                     sorted(self.pages or []), sorted(self.exclude), when))
+
+
+class RuleSet:
+    def __init__(self, name, files, rules):
+        self.name = name
+        self.files = list(files)
+        self.rules = rules
+
+    def signature(self):
+        return '\n'.join([self.name] + [rule.signature() for rule in self.rules])
+
+
+def load_rulesets(names):
+    if str(SCRIPTS_DIR) not in sys.path:
+        sys.path.insert(0, str(SCRIPTS_DIR))
+    return [importlib.import_module(RULESET_MODULES[name]).RULESET for name in names]
+
+
+def transform(filename, content, rulesets):
+    """Aplica, em ordem, as regras de todos os rulesets que valem para o arquivo."""
+    changes = []
+    for ruleset in rulesets:
+        if filename not in ruleset.files:
+            continue
+        for rule in ruleset.rules:
+            if not rule.applies_to(filename):
+                continue
+            updated = rule.apply(content)
+            if updated != content:
+                changes.append(rule.name or f'{ruleset.name}: {rule.regex.pattern[:50]}')
+                content = updated
+    return content, changes
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def _process(filename, names, dry_run):
+    # Executado nos processos do pool
+    rulesets = load_rulesets(names)
+    path = PROJECT_DIR / filename
+    original = path.read_bytes()
+    text = original.decode('utf-8')
+    updated, changes = transform(filename, text, rulesets)
+
+    diff = None
+    if updated != text:
+        if dry_run:
+            diff = ''.join(difflib.unified_diff(
+                text.splitlines(keepends=True), updated.splitlines(keepends=True),
+                fromfile=f'a/{filename}', tofile=f'b/{filename}'))
+        else:
+            tmp_path = path.with_suffix(path.suffix + '.tmp')
+            tmp_path.write_text(updated, encoding='utf-8')
+            os.replace(tmp_path, path)
+    final = updated.encode('utf-8') if not dry_run else original
+    stat = path.stat()
+    return {
+        'file': filename,
+        'changes': changes,
+        'diff': diff,
+        'hash': _digest(final),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+    }
+
+
+def _load_cache():
+    try:
+        return json.loads(CACHE_FILE.read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def _is_unchanged(path, entry, signature):
+    """Arquivo igual ao que a última execução destas mesmas regras deixou."""
+    if not entry or entry.get('signature') != signature:
+        return False
+    stat = path.stat()
+    if stat.st_mtime_ns == entry['mtime_ns'] and stat.st_size == entry['size']:
+        return True
+    return _digest(path.read_bytes()) == entry['hash']
+
+
+def run(names, files=None, dry_run=False, jobs=None, force=False):
+    rulesets = load_rulesets(names)
+    signature = _digest('\n'.join(r.signature() for r in rulesets).encode('utf-8'))
+    if files is None:
+        files = sorted({f for ruleset in rulesets for f in ruleset.files})
+
+    cache = _load_cache()
+    pending, skipped = [], []
+    for filename in files:
+        path = PROJECT_DIR / filename
+        if not path.exists():
+            print(f"Arquivo nao encontrado: {filename}")
+            continue
+        if not force and _is_unchanged(path, cache.get(filename), signature):
+            skipped.append(filename)
+        else:
+            pending.append(filename)
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = list(pool.map(_process, pending, [names] * len(pending), [dry_run] * len(pending)))
+
+    updated_count = 0
+    for result in results:
+        if result['diff']:
+            sys.stdout.write(result['diff'])
+        if result['changes']:
+            updated_count += 1
+            print(f"{'(dry-run) ' if dry_run else ''}Atualizado: {result['file']}")
+            for change in result['changes']:
+                print(f"  - {change}")
+        if not dry_run:
+            cache[result['file']] = {key: result[key] for key in ('hash', 'mtime_ns', 'size')}
+            cache[result['file']]['signature'] = signature
+
+    if not dry_run:
+        CACHE_FILE.write_text(json.dumps(cache, indent=2, sort_keys=True), encoding='utf-8')
+
+    print(f"\n{updated_count} de {len(files)} arquivos atualizados "
+          f"({len(skipped)} sem mudancas desde a ultima execucao).")
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rules', nargs='+', required=True, choices=list(RULESET_MODULES),
+                        help='conjuntos de regras, aplicados nesta ordem')
+    parser.add_argument('--dry-run', action='store_true', help='mostra o diff sem gravar')
+    parser.add_argument('--jobs', type=int, default=None, help='processos (padrao: nucleos)')
+    parser.add_argument('--force', action='store_true', help='ignora o cache de arquivos sem mudancas')
+    parser.add_argument('files', nargs='*', help='arquivos HTML (padrao: os de cada conjunto)')
+    args = parser.parse_args(argv)
+    run(args.rules, files=args.files or None, dry_run=args.dry_run, jobs=args.jobs, force=args.force)
+
+
+if __name__ == '__main__':
+    main()
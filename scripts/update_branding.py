@@ -1,13 +1,15 @@
 #!/usr/bin/env python3
 """
 Script para atualizar todas as páginas HTML com a nova logo, paleta de cores e nome da plataforma
+
+As regras são aplicadas pelo motor de scripts/html_rewrite.py, sobre as
+páginas na raiz do projeto.
 """
 
 import re
-from pathlib import Path
+import sys
 
-# Diretório do projeto
-PROJECT_DIR = Path("/home/ramal442/Documentos/Projetos Mateus/Ágape cursos e Terapia")
+from html_rewrite import Rule, RuleSet, main as rewrite_main
 
 # Páginas HTML para atualizar
 HTML_FILES = [
@@ -41,74 +43,32 @@ NEW_COLORS = {
     '"text-muted": "#[^"]*"': '"text-muted": "#A76B7D"',
 }
 
-def update_html_file(filepath):
-    """Atualiza um arquivo HTML com nova logo, cores e nome"""
-    with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
-    
-    original_content = content
-    
+LOGO_IMG = '<img src="logo.png" alt="Ágape Cursos e Terapia" class="h-8 w-auto"/>'
+
+RULESET = RuleSet('branding', HTML_FILES, [
     # 1. Atualizar nome da plataforma (Ágape Cursos -> Ágape Cursos e Terapia)
-    # Evita duplicação se já estiver atualizado
     # Regex: Encontra 'Ágape Cursos' que NÃO é seguido por ' e Terapia'
-    content = re.sub(r'Ágape Cursos(?! e Terapia)', 'Ágape Cursos e Terapia', content)
-    
+    Rule(r'Ágape Cursos(?! e Terapia)', 'Ágape Cursos e Terapia', name="Nome da plataforma atualizado"),
+
     # 2. Adicionar favicon se não existir
-    if '<link rel="icon"' not in content and '<link rel="shortcut icon"' not in content:
-        content = content.replace(
-            '</title>',
-            '</title>\n    <link rel="icon" type="image/png" href="logo.png"/>'
-        )
-    
+    Rule(re.escape('</title>'), '</title>\n    <link rel="icon" type="image/png" href="logo.png"/>',
+         when=lambda c: '<link rel="icon"' not in c and '<link rel="shortcut icon"' not in c,
+         name="Favicon adicionado"),
+
     # 3. Substituir ícone spa por logo (agora com o nome atualizado no alt)
-    # Padrão: <span class="material-symbols-outlined">spa</span>
-    content = re.sub(
-        r'<span class="material-symbols-outlined[^"]*"[^>]*>spa</span>',
-        '<img src="logo.png" alt="Ágape Cursos e Terapia" class="h-8 w-auto"/>',
-        content
-    )
-    
+    Rule(r'<span class="material-symbols-outlined[^"]*"[^>]*>spa</span>', LOGO_IMG,
+         name="Icone spa substituido pela logo"),
     # Também substituir divs com ícone spa que podem ter sobrado ou variações
-    content = re.sub(
-        r'<div[^>]*>\s*<span class="material-symbols-outlined[^"]*"[^>]*>spa</span>\s*</div>',
-        '<img src="logo.png" alt="Ágape Cursos e Terapia" class="h-8 w-auto"/>',
-        content
-    )
-    
+    Rule(r'<div[^>]*>\s*<span class="material-symbols-outlined[^"]*"[^>]*>spa</span>\s*</div>', LOGO_IMG,
+         name="Div com icone spa substituida pela logo"),
+] + [
     # 4. Atualizar paleta de cores
-    for pattern, replacement in NEW_COLORS.items():
-        content = re.sub(pattern, replacement, content)
-        
+    Rule(pattern, replacement, name=f"Cor {replacement.split(':')[0]}")
+    for pattern, replacement in NEW_COLORS.items()
+] + [
     # 5. Correção específica para o alt da logo se já foi substituído antes com o nome antigo
-    content = content.replace('alt="Ágape Cursos"', 'alt="Ágape Cursos e Terapia"')
-    
-    # Salvar apenas se houver mudanças
-    if content != original_content:
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
-        return True
-    return False
-
-def main():
-    """Função principal"""
-    updated_count = 0
-    
-    print("Iniciando atualização...")
-    for html_file in HTML_FILES:
-        filepath = PROJECT_DIR / html_file
-        if filepath.exists():
-            try:
-                if update_html_file(filepath):
-                    print(f"✓ Atualizado: {html_file}")
-                    updated_count += 1
-                else:
-                    print(f"- Sem alterações: {html_file}")
-            except Exception as e:
-                print(f"Erro ao processar {html_file}: {e}")
-        else:
-            print(f"✗ Não encontrado: {html_file}")
-    
-    print(f"\n{updated_count} de {len(HTML_FILES)} arquivos atualizados.")
+    Rule(re.escape('alt="Ágape Cursos"'), 'alt="Ágape Cursos e Terapia"', name="Alt da logo corrigido"),
+])
 
 if __name__ == "__main__":
-    main()
+    rewrite_main(['--rules', 'branding'] + sys.argv[1:])
@@ -0,0 +1,123 @@
+"""
+Busca de cursos no servidor, sem diferenciar acentos.
+
+No SQLite usa uma tabela FTS5 com o tokenizer unicode61 (remove_diacritics),
+no Postgres um tsvector com o texto já sem acentos. Em ambos o nome pesa mais
+que a descrição no ranking. O índice é recriado após cada escrita em Course;
+o catálogo tem poucas linhas, então reconstruí-lo inteiro é barato.
+"""
+
+import re
+import unicodedata
+
+from sqlalchemy import text
+
+from catalog import catalog
+from models import db, Course
+
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+SEARCH_LIMIT = 20
+SUGGEST_LIMIT = 8
+
+
+def fold(value):
+    """'Terapêutica' -> 'terapeutica'."""
+    decomposed = unicodedata.normalize('NFKD', value or '')
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+
+def _tokens(query):
+    return TOKEN_RE.findall(fold(query))[:8]
+
+
+def _dialect():
+    return db.engine.dialect.name
+
+
+def create_search_index(connection):
+    if connection.dialect.name == 'sqlite':
+        connection.execute(text(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS course_search USING fts5("
+            "course_id UNINDEXED, name, description, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"))
+    else:
+        connection.execute(text(
+            'CREATE TABLE IF NOT EXISTS course_search ('
+            'course_id VARCHAR(50) PRIMARY KEY, document tsvector NOT NULL)'))
+        connection.execute(text(
+            'CREATE INDEX IF NOT EXISTS ix_course_search_document ON course_search USING GIN (document)'))
+
+
+def reindex(connection):
+    courses = connection.execute(
+        Course.__table__.select().with_only_columns(Course.id, Course.name, Course.description)).all()
+    connection.execute(text('DELETE FROM course_search'))
+    if not courses:
+        return
+    if connection.dialect.name == 'sqlite':
+        connection.execute(
+            text('INSERT INTO course_search (course_id, name, description) VALUES (:id, :name, :description)'),
+            [{'id': c.id, 'name': c.name, 'description': c.description or ''} for c in courses])
+    else:
+        connection.execute(
+            text("INSERT INTO course_search (course_id, document) VALUES (:id, "
+                 "setweight(to_tsvector('simple', :name), 'A') || "
+                 "setweight(to_tsvector('simple', :description), 'B'))"),
+            [{'id': c.id, 'name': fold(c.name), 'description': fold(c.description)} for c in courses])
+
+
+def _reindex_after_write():
+    # Chamado após o commit: usa uma transação própria
+    with db.engine.begin() as connection:
+        reindex(connection)
+
+
+catalog.subscribe(_reindex_after_write)
+
+
+def _fts5_query(tokens, column=None):
+    # Todos os termos obrigatórios; o último também como prefixo (digitação)
+    terms = [f'"{t}"' for t in tokens[:-1]] + [f'"{tokens[-1]}"*']
+    query = ' AND '.join(terms)
+    return f'{column}: ({query})' if column else query
+
+
+def _tsquery(tokens, weight=''):
+    return ' & '.join([t for t in tokens[:-1]] + [f'{tokens[-1]}:*{weight}'])
+
+
+def search_courses(query, limit=SEARCH_LIMIT):
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+    if _dialect() == 'sqlite':
+        sql = text(
+            'SELECT c.id, c.name, c.price, c.description FROM course_search s '
+            'JOIN course c ON c.id = s.course_id '
+            'WHERE course_search MATCH :q ORDER BY bm25(course_search, 0.0, 10.0, 1.0) LIMIT :limit')
+        params = {'q': _fts5_query(tokens), 'limit': limit}
+    else:
+        sql = text(
+            "SELECT c.id, c.name, c.price, c.description FROM course_search s "
+            "JOIN course c ON c.id = s.course_id, to_tsquery('simple', :q) query "
+            "WHERE s.document @@ query ORDER BY ts_rank(s.document, query) DESC LIMIT :limit")
+        params = {'q': _tsquery(tokens), 'limit': limit}
+    return [Course(id=r.id, name=r.name, price=r.price, description=r.description).to_dict()
+            for r in db.session.execute(sql, params)]
+
+
+def suggest_courses(query, limit=SUGGEST_LIMIT):
+    """Autocomplete: só o nome, com o último termo como prefixo."""
+    tokens = _tokens(query)
+    if not tokens:
+        return []
+    if _dialect() == 'sqlite':
+        sql = text('SELECT course_id, name FROM course_search WHERE course_search MATCH :q '
+                   'ORDER BY rank LIMIT :limit')
+        params = {'q': _fts5_query(tokens, column='name'), 'limit': limit}
+    else:
+        sql = text("SELECT s.course_id, c.name FROM course_search s JOIN course c ON c.id = s.course_id, "
+                   "to_tsquery('simple', :q) query WHERE s.document @@ query "
+                   "ORDER BY ts_rank(s.document, query) DESC LIMIT :limit")
+        params = {'q': _tsquery(tokens, weight='A'), 'limit': limit}
+    return [{'id': r[0], 'name': r[1]} for r in db.session.execute(sql, params)]
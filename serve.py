@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Servidor de produção pre-fork.
+
+    python serve.py --bind 0.0.0.0:8000
+
+São três níveis de processo:
+
+- supervisor: abre o socket e vigia tmp/restart.txt. Nunca importa o app, então
+  o PID e o socket continuam os mesmos entre deploys;
+- geração: importa e aquece o app (rotas, templates compilados, catálogo,
+  manifesto das páginas) e faz fork dos workers, que herdam essa memória em
+  copy-on-write em vez de cada um carregar tudo de novo;
+- workers: atendem no socket compartilhado, cada um com um pool de threads.
+
+Ao tocar tmp/restart.txt (como no Passenger), o supervisor sobe uma geração
+nova com o código atual, espera os workers dela ficarem prontos e só então
+encerra a antiga, que termina as requisições em andamento antes de sair.
+Nenhuma conexão é recusada durante o restart.
+"""
+
+import argparse
+import gc
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def default_workers():
+    # O hash de senha já roda num pool de processos à parte; um worker a mais
+    # que os núcleos cobre o que estiver esperando banco ou gateway
+    return (os.cpu_count() or 1) + 1
+
+
+def log(message):
+    print(f'[serve {os.getpid()}] {message}', file=sys.stderr, flush=True)
+
+
+# --- Supervisor ---
+
+def supervise(args):
+    # Sem SECRET_KEY o app sorteia uma chave por processo: cada worker assinaria
+    # os cookies de sessão com a sua, e o aluno cairia fora a cada requisição.
+    # O supervisor não importa o app, então lê o .env aqui
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(BASE_DIR, '.env'))
+    if not os.getenv('SECRET_KEY'):
+        raise SystemExit('Defina SECRET_KEY (a mesma para todos os workers) antes de iniciar o serve.py')
+    host, port = parse_bind(args.bind)
+    sock = socket.create_server((host, port), backlog=2048)
+    sock.set_inheritable(True)
+    log(f'Escutando em {args.bind} com {args.workers} workers x {args.threads} threads')
+
+    # Métricas de cada worker, somadas pelo /metrics (ver metrics.py). Limpo só
+    # aqui: entre gerações os contadores continuam subindo
+    os.makedirs(args.metrics_dir, exist_ok=True)
+    for filename in os.listdir(args.metrics_dir):
+        os.remove(os.path.join(args.metrics_dir, filename))
+    os.environ['METRICS_DIR'] = args.metrics_dir
+
+    stopping = threading.Event()
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: stopping.set())
+
+    generation = spawn_generation(args, sock)
+    if generation is None:
+        raise SystemExit('A aplicação não iniciou')
+    restart_mtime = mtime(args.restart_file)
+
+    while not stopping.wait(1):
+        if generation.poll() is not None:
+            log(f'Geração {generation.pid} saiu com código {generation.returncode}; iniciando outra')
+            generation = spawn_generation(args, sock) or generation
+            continue
+        current = mtime(args.restart_file)
+        if current == restart_mtime:
+            continue
+        restart_mtime = current
+        log(f'{args.restart_file} alterado: restart gradual')
+        new = spawn_generation(args, sock)
+        if new is None:
+            log('Nova geração falhou ao iniciar; a atual continua atendendo')
+            continue
+        stop_generation(generation, args.graceful_timeout)
+        generation = new
+
+    log('Encerrando')
+    stop_generation(generation, args.graceful_timeout)
+
+
+def spawn_generation(args, sock):
+    """Sobe uma geração e espera ela avisar que os workers estão prontos."""
+    ready_read, ready_write = os.pipe()
+    command = [sys.executable, os.path.abspath(__file__), '--bind', args.bind,
+               '--workers', str(args.workers), '--threads', str(args.threads),
+               '--graceful-timeout', str(args.graceful_timeout),
+               '--bytecode-cache', args.bytecode_cache,
+               '--generation', str(sock.fileno()), '--ready-fd', str(ready_write)]
+    process = subprocess.Popen(command, cwd=BASE_DIR, pass_fds=(sock.fileno(), ready_write))
+    os.close(ready_write)
+    try:
+        readable, _, _ = select.select([ready_read], [], [], args.startup_timeout)
+        if readable and os.read(ready_read, 16) == b'ready':
+            return process
+    finally:
+        os.close(ready_read)
+    process.kill()
+    process.wait()
+    return None
+
+
+def stop_generation(process, timeout):
+    process.terminate()
+    try:
+        process.wait(timeout + 5)
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.wait()
+
+
+def mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+
+
+def parse_bind(bind):
+    host, _, port = bind.rpartition(':')
+    return host or '0.0.0.0', int(port)
+
+
+# --- Geração ---
+
+def preload(args):
+    """Importa o app e deixa pronto tudo que os workers podem compartilhar."""
+    os.environ.setdefault('PASSWORD_HASH_WORKERS', str(max(1, (os.cpu_count() or 1) // args.workers)))
+    sys.path.insert(0, BASE_DIR)
+    from jinja2 import FileSystemBytecodeCache
+    import app as app_module
+    from catalog import catalog
+    from models import db
+    from pages import list_pages
+
+    app = app_module.app
+    # Templates compilados ficam em disco e sobrevivem ao restart
+    os.makedirs(args.bytecode_cache, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(args.bytecode_cache)
+    for name in list_pages(app):
+        app.jinja_env.get_template(name)
+    app_module.page_store.manifest
+
+    with app.app_context():
+        try:
+            catalog.get_list()
+        except Exception as error:
+            log(f'Catálogo não pré-carregado: {error}')
+        # Conexões abertas aqui não podem ser usadas pelos filhos
+        db.engine.dispose()
+
+    # Objetos já carregados saem do GC, que de outra forma tocaria cada um e
+    # quebraria o compartilhamento copy-on-write
+    gc.collect()
+    gc.freeze()
+    return app
+
+
+def run_generation(args):
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # o supervisor coordena o Ctrl+C
+    app = preload(args)
+
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stopping.set())
+
+    workers = {}
+    for index in range(args.workers):
+        pid = spawn_worker(app, args)
+        workers[pid] = index
+    os.write(args.ready_fd, b'ready')
+    os.close(args.ready_fd)
+    log(f'Geração pronta com {len(workers)} workers')
+
+    while not stopping.wait(0.5):
+        for pid in reap(workers):
+            log(f'Worker {pid} saiu; iniciando outro')
+            workers[spawn_worker(app, args)] = workers.pop(pid)
+
+    for pid in workers:
+        os.kill(pid, signal.SIGTERM)
+    deadline = time.monotonic() + args.graceful_timeout
+    while workers and time.monotonic() < deadline:
+        for pid in reap(workers):
+            workers.pop(pid)
+        time.sleep(0.1)
+    for pid in workers:
+        os.kill(pid, signal.SIGKILL)
+
+
+def reap(workers):
+    exited = []
+    for pid in list(workers):
+        done, _ = os.waitpid(pid, os.WNOHANG)
+        if done:
+            exited.append(pid)
+    return exited
+
+
+def spawn_worker(app, args):
+    pid = os.fork()
+    if pid:
+        return pid
+    try:
+        run_worker(app, args)
+    except BaseException:
+        traceback.print_exc()
+        os._exit(1)
+    os._exit(0)
+
+
+# --- Worker ---
+
+def run_worker(app, args):
+    from werkzeug.serving import BaseWSGIServer, WSGIRequestHandler
+
+    class Handler(WSGIRequestHandler):
+        # Sem keep-alive: uma conexão ociosa não prende uma thread do pool
+        protocol_version = 'HTTP/1.0'
+
+        def make_environ(self):
+            environ = super().make_environ()
+            # Materiais da biblioteca vão do arquivo direto para o socket (ver library.py)
+            environ['agape.sendfile'] = self.connection.sendfile
+            return environ
+
+    class PooledWSGIServer(BaseWSGIServer):
+        multithread = True
+
+        def __init__(self, *server_args, threads, **kwargs):
+            super().__init__(*server_args, **kwargs)
+            # Vários workers esperam no mesmo socket: quem perde a corrida pelo
+            # accept() volta ao loop em vez de ficar bloqueado nele
+            self.socket.setblocking(False)
+            self.pool = ThreadPoolExecutor(threads, thread_name_prefix='http')
+            self.slots = threading.BoundedSemaphore(threads)
+
+        def get_request(self):
+            # Com todas as threads ocupadas o worker para de aceitar, e a
+            # conexão fica para outro worker do mesmo socket
+            self.slots.acquire()
+            try:
+                return super().get_request()
+            except BaseException:
+                self.slots.release()
+                raise
+
+        def process_request(self, request, client_address):
+            self.pool.submit(self._process, request, client_address)
+
+        def _process(self, request, client_address):
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                self.slots.release()
+
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    host, port = parse_bind(args.bind)
+    server = PooledWSGIServer(host, port, app, handler=Handler, fd=args.generation, threads=args.threads)
+    signal.signal(signal.SIGTERM, lambda *_: threading.Thread(target=server.shutdown).start())
+    server.serve_forever()
+    # Termina as requisições em andamento antes de sair
+    server.pool.shutdown(wait=True)
+    # os._exit() não roda o atexit: grava aqui o que o app ainda tem em memória
+    from app import shutdown
+    shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bind', default=os.getenv('BIND', '127.0.0.1:8000'))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('WEB_CONCURRENCY', '0')) or default_workers())
+    parser.add_argument('--threads', type=int, default=int(os.getenv('WEB_THREADS', '4')))
+    parser.add_argument('--graceful-timeout', type=float, default=30)
+    parser.add_argument('--startup-timeout', type=float, default=60)
+    parser.add_argument('--restart-file', default=os.path.join(BASE_DIR, 'tmp', 'restart.txt'))
+    parser.add_argument('--bytecode-cache', default=os.getenv('JINJA_CACHE_DIR', os.path.join(BASE_DIR, 'build', 'jinja')))
+    parser.add_argument('--metrics-dir', default=os.getenv('METRICS_DIR', os.path.join(BASE_DIR, 'build', 'metrics')))
+    parser.add_argument('--generation', type=int, help=argparse.SUPPRESS)
+    parser.add_argument('--ready-fd', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.generation is None:
+        supervise(args)
+    else:
+        run_generation(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+"""
+Horários livres da agenda (agendamento.html).
+
+Os horários saem das janelas semanais de Availability menos as reservas
+confirmadas. Em vez de cruzar as duas tabelas a cada requisição, cada dia
+consultado é calculado uma vez e guardado num índice em memória (dia ->
+horários livres, em ordem); /api/slots só faz uma busca no dicionário por dia.
+Reservar ou cancelar atualiza apenas o dia afetado.
+
+Um horário está livre quando nenhuma reserva confirmada se sobrepõe a ele, não
+só quando não há reserva começando no mesmo minuto: a grade muda quando as
+janelas mudam (09:00-10:00 reservado numa grade de 60 minutos ocupa 09:00 e
+09:30 numa de 30). Para que a conferência e o INSERT não corram contra outra
+reserva, book() trava com FOR UPDATE as janelas do dia da semana; duas
+reservas no mesmo dia da semana, e a troca das janelas (replace_windows, que
+trava todas), passam uma de cada vez. O índice único parcial em
+Booking.starts_at continua recusando a segunda reserva no mesmo início. No
+SQLite não há FOR UPDATE, mas só uma transação escreve por vez. O índice em
+memória é por processo; outro worker enxerga uma reserva ou cancelamento feito
+aqui em até `ttl` segundos, e até lá uma tentativa no horário já ocupado é
+recusada na reserva.
+"""
+
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Availability, Booking
+
+
+class InvalidSlot(Exception):
+    """O horário não existe na agenda (fora das janelas, no passado ou longe demais)."""
+
+
+class SlotTaken(Exception):
+    """O horário já tem uma reserva confirmada."""
+
+
+class BookingConflict(Exception):
+    """As novas janelas deixariam reservas futuras confirmadas fora da agenda."""
+
+    def __init__(self, bookings):
+        super().__init__(bookings)
+        self.bookings = bookings
+
+
+def validate_windows(windows):
+    """Lista de erros das janelas (weekday, start_time, end_time, slot_minutes)."""
+    errors = []
+    by_day = {}
+    for weekday, start, end, minutes in windows:
+        if not 0 <= weekday <= 6:
+            errors.append(f'Dia da semana inválido: {weekday}')
+        elif start >= end:
+            errors.append(f'Janela vazia: {start:%H:%M}-{end:%H:%M}')
+        elif minutes <= 0:
+            errors.append(f'Duração inválida: {minutes} minutos')
+        else:
+            by_day.setdefault(weekday, []).append((start, end))
+    for weekday, intervals in by_day.items():
+        intervals.sort()
+        for (_, previous_end), (start, end) in zip(intervals, intervals[1:]):
+            if start < previous_end:
+                errors.append(f'Janelas sobrepostas no dia {weekday}: {start:%H:%M}-{end:%H:%M}')
+    return errors
+
+
+class SlotEngine:
+    def __init__(self, ttl=30, horizon_days=90):
+        self.ttl = ttl
+        self.horizon_days = horizon_days
+        self._lock = threading.Lock()
+        self._version = 0
+        self._windows = None
+        self._windows_at = 0.0
+        # dia -> (montado em, [{'start', 'end'}] em ordem)
+        self._days = {}
+
+    def invalidate(self):
+        """Descarta o índice inteiro; usado quando as janelas mudam."""
+        with self._lock:
+            self._version += 1
+            self._windows = None
+            self._days = {}
+
+    # --- Consulta ---
+
+    def free_slots(self, first_day, last_day):
+        """{dia ISO: horários livres} de first_day a last_day, inclusive."""
+        days = [first_day + timedelta(days=n) for n in range((last_day - first_day).days + 1)]
+        index = self._ensure_days(days)
+        now = datetime.now()
+        today = now.date()
+        cutoff = now.isoformat(timespec='minutes')
+        result = {}
+        for day in days:
+            slots = index[day]
+            if day < today:
+                slots = []
+            elif day == today:
+                slots = [slot for slot in slots if slot['start'] > cutoff]
+            result[day.isoformat()] = slots
+        return result
+
+    def _ensure_days(self, days):
+        now = time.monotonic()
+        with self._lock:
+            version = self._version
+            windows = self._load_windows(now)
+            index = {}
+            missing = []
+            for day in days:
+                entry = self._days.get(day)
+                if entry is not None and now - entry[0] < self.ttl:
+                    index[day] = entry[1]
+                else:
+                    missing.append(day)
+        if not missing:
+            return index
+
+        # Uma consulta só para todos os dias que faltam
+        start = datetime.combine(min(missing), datetime.min.time())
+        end = datetime.combine(max(missing) + timedelta(days=1), datetime.min.time())
+        booked = {}
+        for starts_at, ends_at in db.session.query(Booking.starts_at, Booking.ends_at).filter(
+                Booking.status == 'confirmed', Booking.starts_at < end, Booking.ends_at > start):
+            booked.setdefault(starts_at.date(), []).append((starts_at, ends_at))
+        with self._lock:
+            # Uma reserva feita durante a consulta tornaria esses dias antigos
+            store = self._version == version
+            if store:
+                yesterday = datetime.now().date() - timedelta(days=1)
+                for day in [day for day in self._days if day < yesterday]:
+                    del self._days[day]
+            for day in missing:
+                taken = booked.get(day, ())
+                slots = [_payload(starts_at, ends_at) for starts_at, ends_at in _day_grid(day, windows)
+                         if not any(starts_at < other_end and other_start < ends_at
+                                    for other_start, other_end in taken)]
+                index[day] = slots
+                if store:
+                    self._days[day] = (now, slots)
+        return index
+
+    def _load_windows(self, now):
+        # Chamado com o lock: dia da semana -> [(início, fim, minutos)]
+        if self._windows is None or now - self._windows_at >= self.ttl:
+            windows = {}
+            for window in Availability.query.order_by(Availability.start_time):
+                windows.setdefault(window.weekday, []).append(
+                    (window.start_time, window.end_time, window.slot_minutes))
+            self._windows = windows
+            self._windows_at = now
+        return self._windows
+
+    # --- Reservas ---
+
+    def book(self, starts_at, **fields):
+        """Reserva o horário ou levanta InvalidSlot/SlotTaken."""
+        now = datetime.now()
+        if starts_at <= now or starts_at.date() > now.date() + timedelta(days=self.horizon_days):
+            raise InvalidSlot()
+        # Janelas lidas na transação e travadas, não as do cache: reservas do
+        # mesmo dia da semana e a troca de janelas esperam este commit
+        windows = {}
+        for window in Availability.query.filter_by(weekday=starts_at.weekday()).with_for_update():
+            windows.setdefault(window.weekday, []).append(
+                (window.start_time, window.end_time, window.slot_minutes))
+        ends_at = next((slot_end for slot_start, slot_end in _day_grid(starts_at.date(), windows)
+                        if slot_start == starts_at), None)
+        if ends_at is None:
+            db.session.rollback()
+            raise InvalidSlot()
+        if _overlapping(starts_at, ends_at).first() is not None:
+            db.session.rollback()
+            self._update(starts_at, ends_at, free=False)
+            raise SlotTaken()
+        booking = Booking(starts_at=starts_at, ends_at=ends_at, status='confirmed', **fields)
+        db.session.add(booking)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            # Reservado por outra requisição (talvez em outro worker)
+            self._update(starts_at, ends_at, free=False)
+            raise SlotTaken()
+        self._update(starts_at, ends_at, free=False)
+        return booking
+
+    def cancel(self, booking):
+        """Cancela a reserva e devolve o horário à agenda."""
+        if booking.status != 'confirmed':
+            return booking
+        booking.status = 'cancelled'
+        booking.cancelled_at = datetime.utcnow()
+        db.session.commit()
+        self._update(booking.starts_at, booking.ends_at, free=True)
+        return booking
+
+    def replace_windows(self, windows):
+        """Troca todas as janelas semanais ou levanta BookingConflict.
+
+        Recusa a troca se alguma reserva futura confirmada ficaria fora das novas
+        janelas; a reserva pode ocupar mais de um horário da nova grade.
+        """
+        # Trava todas as janelas: nenhuma reserva entra entre a conferência e o commit
+        Availability.query.with_for_update().all()
+        by_day = {}
+        for weekday, start, end, _ in windows:
+            by_day.setdefault(weekday, []).append((start, end))
+        conflicts = [booking for booking in Booking.query.filter(
+                         Booking.status == 'confirmed', Booking.ends_at > datetime.now()
+                     ).order_by(Booking.starts_at)
+                     if not any(start <= booking.starts_at.time() and booking.ends_at.time() <= end
+                                for start, end in by_day.get(booking.starts_at.weekday(), ()))]
+        if conflicts:
+            db.session.rollback()
+            raise BookingConflict(conflicts)
+        Availability.query.delete()
+        db.session.add_all(Availability(weekday=weekday, start_time=start, end_time=end, slot_minutes=minutes)
+                           for weekday, start, end, minutes in windows)
+        db.session.commit()
+        self.invalidate()
+
+    def _update(self, starts_at, ends_at, free):
+        day = starts_at.date()
+        payload = _payload(starts_at, ends_at)
+        with self._lock:
+            self._version += 1
+            entry = self._days.get(day)
+            if entry is None:
+                return  # dia ainda não consultado: será montado do banco
+            if free:
+                # Outra reserva pode ocupar parte dos horários liberados: remonta o dia
+                del self._days[day]
+                return
+            built_at, slots = entry
+            # Listas novas: quem já leu o dia continua com a versão anterior
+            slots = [slot for slot in slots
+                     if not (slot['start'] < payload['end'] and payload['start'] < slot['end'])]
+            self._days[day] = (built_at, slots)
+
+
+def _day_grid(day, windows):
+    """Todos os horários (início, fim) do dia pelas janelas, livres ou não."""
+    for start_time, end_time, minutes in windows.get(day.weekday(), ()):
+        step = timedelta(minutes=minutes)
+        cursor = datetime.combine(day, start_time)
+        end = datetime.combine(day, end_time)
+        while cursor + step <= end:
+            yield cursor, cursor + step
+            cursor += step
+
+
+def _overlapping(starts_at, ends_at):
+    """Reservas confirmadas que ocupam parte de [starts_at, ends_at)."""
+    return Booking.query.filter(Booking.status == 'confirmed',
+                                Booking.starts_at < ends_at, Booking.ends_at > starts_at)
+
+
+def _payload(starts_at, ends_at):
+    return {'start': starts_at.isoformat(timespec='minutes'), 'end': ends_at.isoformat(timespec='minutes')}
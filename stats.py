@@ -0,0 +1,146 @@
+"""
+Estatísticas do painel admin a partir de agregados diários.
+
+Somar a tabela de pedidos a cada atualização do painel fica mais lento à
+medida que ela cresce. Em vez disso, cada flush que cria, altera ou remove
+pedidos aplica a diferença em OrderDailyRollup, na mesma transação. O painel
+lê só os agregados do período, cujo tamanho não depende do número de pedidos.
+"""
+
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+from database import upsert_insert
+from models import db, Course, Order, OrderDailyRollup
+
+ROLLUP_TABLE = OrderDailyRollup.__table__
+ROLLUP_KEY = ('day', 'course_id', 'status', 'payment_method')
+
+
+def rollup_key(day, course_id, status, payment_method):
+    if isinstance(day, datetime):
+        day = day.date()
+    return (day, course_id, status or 'pending', payment_method or '')
+
+
+def _order_key(order, use_history=False):
+    """Chave do pedido; com use_history, os valores antes das mudanças pendentes."""
+    values = {}
+    state = inspect(order)
+    for name in ('created_at', 'course_id', 'status', 'payment_method', 'total_amount'):
+        value = getattr(order, name)
+        if use_history:
+            history = state.attrs[name].history
+            if history.deleted:
+                value = history.deleted[0]
+        values[name] = value
+    key = rollup_key(values['created_at'] or datetime.utcnow(), values['course_id'],
+                     values['status'], values['payment_method'])
+    return key, values['total_amount'] or 0.0
+
+
+def apply_deltas(connection, deltas):
+    """Soma {chave: [pedidos, receita]} nos agregados com um upsert."""
+    rows = [dict(zip(ROLLUP_KEY, key), order_count=count, revenue=revenue)
+            for key, (count, revenue) in deltas.items() if count or revenue]
+    if not rows:
+        return
+    stmt = upsert_insert(connection, ROLLUP_TABLE).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=list(ROLLUP_KEY),
+        set_={
+            'order_count': ROLLUP_TABLE.c.order_count + stmt.excluded.order_count,
+            'revenue': ROLLUP_TABLE.c.revenue + stmt.excluded.revenue,
+        },
+    )
+    connection.execute(stmt)
+
+
+def add_order_delta(deltas, key, amount, sign=1):
+    entry = deltas.setdefault(key, [0, 0.0])
+    entry[0] += sign
+    entry[1] += sign * amount
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_rollups(session, flush_context):
+    # new/dirty/deleted e o histórico dos atributos ainda refletem o estado
+    # anterior ao flush neste evento
+    deltas = {}
+    for obj in session.new:
+        if isinstance(obj, Order):
+            add_order_delta(deltas, *_order_key(obj))
+    for obj in session.dirty:
+        if isinstance(obj, Order) and session.is_modified(obj, include_collections=False):
+            old_key, old_amount = _order_key(obj, use_history=True)
+            new_key, new_amount = _order_key(obj)
+            if (old_key, old_amount) != (new_key, new_amount):
+                add_order_delta(deltas, old_key, old_amount, -1)
+                add_order_delta(deltas, new_key, new_amount)
+    for obj in session.deleted:
+        if isinstance(obj, Order):
+            add_order_delta(deltas, *_order_key(obj, use_history=True), sign=-1)
+    if deltas:
+        apply_deltas(session.connection(), deltas)
+
+
+def rebuild_rollups():
+    """Recalcula todos os agregados a partir da tabela de pedidos."""
+    day = func.date(Order.created_at)
+    rows = (db.session.query(day, Order.course_id, Order.status, Order.payment_method,
+                             func.count(Order.id), func.coalesce(func.sum(Order.total_amount), 0.0))
+            .group_by(day, Order.course_id, Order.status, Order.payment_method)
+            .all())
+    db.session.execute(ROLLUP_TABLE.delete())
+    deltas = {}
+    for created, course_id, status, payment_method, count, revenue in rows:
+        if isinstance(created, str):
+            created = datetime.strptime(created, '%Y-%m-%d').date()
+        entry = deltas.setdefault(rollup_key(created, course_id, status, payment_method), [0, 0.0])
+        entry[0] += count
+        entry[1] += revenue
+    apply_deltas(db.session.connection(), deltas)
+    db.session.commit()
+    return len(deltas)
+
+
+def dashboard_stats(start, end):
+    """Resumo do período [start, end] (datas inclusivas) para o painel admin."""
+    rows = (OrderDailyRollup.query
+            .filter(OrderDailyRollup.day >= start, OrderDailyRollup.day <= end)
+            .all())
+    course_names = dict(db.session.query(Course.id, Course.name).all())
+
+    by_status = defaultdict(int)
+    by_course = defaultdict(lambda: {'orders': 0, 'revenue': 0.0})
+    by_method = defaultdict(lambda: {'orders': 0, 'revenue': 0.0})
+    daily = defaultdict(lambda: {'orders': 0, 'revenue': 0.0})
+    totals = {'orders': 0, 'paid_orders': 0, 'revenue': 0.0}
+
+    for row in rows:
+        by_status[row.status] += row.order_count
+        totals['orders'] += row.order_count
+        # Receita e vendas contam só pedidos pagos
+        if row.status != 'paid':
+            continue
+        totals['paid_orders'] += row.order_count
+        totals['revenue'] += row.revenue
+        for bucket in (by_course[row.course_id], by_method[row.payment_method or 'desconhecido'],
+                       daily[row.day.isoformat()]):
+            bucket['orders'] += row.order_count
+            bucket['revenue'] += row.revenue
+
+    return {
+        'period': {'from': start.isoformat(), 'to': end.isoformat()},
+        'totals': totals,
+        'by_status': dict(by_status),
+        'by_course': sorted(
+            ({'course_id': course_id, 'name': course_names.get(course_id, course_id), **values}
+             for course_id, values in by_course.items()),
+            key=lambda c: c['revenue'], reverse=True),
+        'by_payment_method': dict(by_method),
+        'daily': [{'date': day, **values} for day, values in sorted(daily.items())],
+    }
@@ -0,0 +1,84 @@
+"""
+Listagem de alunos para o painel admin.
+
+Paginação por cursor em (created_at, id): cada página é uma busca no índice a
+partir do último aluno da página anterior, então a página 5.000 custa o mesmo
+que a primeira (OFFSET precisaria percorrer todas as linhas anteriores). Os
+pedidos da página vêm numa única consulta IN, em vez de uma por aluno, e as
+duas consultas trazem só as colunas da resposta (ver projections.py).
+"""
+
+import base64
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+from models import User, Order
+from projections import Projection, USER, ORDER
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+STUDENT = Projection(**USER.fields, created_at=User.created_at)
+STUDENT_ORDER = Projection(**ORDER.fields, user_id=Order.user_id)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(student):
+    raw = f"{student['created_at'].isoformat()}|{student['id']}"
+    return base64.urlsafe_b64encode(raw.encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode('utf-8')
+        created_at, user_id = raw.split('|')
+        return datetime.fromisoformat(created_at), int(user_id)
+    except (ValueError, UnicodeDecodeError) as error:
+        raise InvalidCursor(str(error)) from error
+
+
+def _escape_like(value):
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def list_students(cursor=None, limit=DEFAULT_LIMIT, search=None):
+    """Página de alunos, do mais recente para o mais antigo, com seus pedidos."""
+    limit = max(1, min(limit, MAX_LIMIT))
+    stmt = STUDENT.select()
+
+    if search:
+        prefix = _escape_like(search.strip()) + '%'
+        stmt = stmt.where(or_(User.email.like(prefix, escape='\\'),
+                              User.name.like(prefix, escape='\\')))
+
+    if cursor:
+        created_at, user_id = decode_cursor(cursor)
+        stmt = stmt.where(or_(User.created_at < created_at,
+                              and_(User.created_at == created_at, User.id < user_id)))
+
+    # Um a mais para saber se existe próxima página sem um COUNT
+    students = STUDENT.all(stmt.order_by(User.created_at.desc(), User.id.desc()).limit(limit + 1))
+    has_more = len(students) > limit
+    students = students[:limit]
+
+    orders_by_user = {student['id']: [] for student in students}
+    if students:
+        stmt = STUDENT_ORDER.select().where(Order.user_id.in_(list(orders_by_user))).order_by(Order.id)
+        for order in STUDENT_ORDER.all(stmt):
+            orders_by_user[order.pop('user_id')].append(order)
+
+    for student in students:
+        orders = orders_by_user[student['id']]
+        paid = [order for order in orders if order['status'] == 'paid']
+        student['orders'] = orders
+        student['courses'] = sorted({order['course_id'] for order in paid})
+        student['total_spent'] = sum(order['total_amount'] for order in paid)
+
+    return {
+        'data': students,
+        'next_cursor': encode_cursor(students[-1]) if has_more else None,
+    }
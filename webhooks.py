@@ -0,0 +1,216 @@
+"""
+Webhooks de pagamento do gateway (Asaas) com outbox durável.
+
+O api/webhook.php buscava o pedido e o atualizava de forma síncrona, com o
+gateway esperando as duas chamadas, e reprocessava eventos repetidos. Aqui a
+requisição só grava o evento numa tabela local (chave única pelo id do evento,
+então repetições são descartadas) e responde 200. Uma thread por processo
+aplica os eventos pendentes em lotes, na ordem de chegada, numa transação por
+lote; se o lote falha, os eventos são refeitos um a um e o que falhar sozinho
+fica como rejeitado, sem travar os seguintes. Eventos gravados antes de um
+restart são aplicados no próximo webhook recebido ou com `flask payments-apply`.
+"""
+
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import select
+
+from background import BackgroundThread
+from database import upsert_insert
+from models import db, Order, PaymentEvent
+
+# Evento do gateway -> status interno do pedido (mesmo mapeamento do webhook.php)
+EVENT_STATUS = {
+    'PAYMENT_RECEIVED': 'paid',
+    'PAYMENT_CONFIRMED': 'paid',
+    'PAYMENT_OVERDUE': 'failed',
+    'PAYMENT_REFUNDED': 'refunded',
+}
+
+# Status novo -> status de onde ele pode vir. Um evento atrasado (ex.: vencido
+# depois de pago) não desfaz uma transição posterior
+TRANSITIONS = {
+    'paid': {'pending', 'failed'},
+    'failed': {'pending'},
+    'refunded': {'paid'},
+}
+
+PAYMENT_EVENT_TABLE = PaymentEvent.__table__
+
+
+class InvalidEvent(Exception):
+    """Payload sem os campos mínimos de um evento de pagamento."""
+
+
+def record_event(payload):
+    """
+    Grava o evento na outbox e confirma a transação.
+    Retorna True se ele é novo, False se é repetido ou de um tipo ignorado.
+    """
+    payment = payload.get('payment') or {}
+    event = payload.get('event')
+    if not event or not payment.get('id'):
+        raise InvalidEvent()
+    status = EVENT_STATUS.get(event)
+    if status is None:
+        return False
+
+    # Payloads antigos do Asaas não trazem id do evento
+    event_id = str(payload.get('id') or f"{event}:{payment['id']}")
+    row = {
+        'event_id': event_id[:100],
+        'event': event[:50],
+        'payment_id': str(payment['id'])[:64],
+        'external_reference': str(payment.get('externalReference') or '')[:100] or None,
+        'status': status,
+        'received_at': datetime.utcnow(),
+    }
+    connection = db.session.connection()
+    stmt = upsert_insert(connection, PAYMENT_EVENT_TABLE).values(row)
+    result = connection.execute(stmt.on_conflict_do_nothing(index_elements=['event_id']))
+    db.session.commit()
+    return result.rowcount == 1
+
+
+# Maior id que cabe na coluna Integer de Order (int4 no Postgres)
+MAX_ORDER_ID = 2 ** 31 - 1
+
+
+def _order_reference(event):
+    # externalReference com o id do pedido, para pedidos ainda sem payment_id
+    reference = event.external_reference or ''
+    if not (reference.isascii() and reference.isdigit()):
+        return None
+    order_id = int(reference)
+    return order_id if 0 < order_id <= MAX_ORDER_ID else None
+
+
+def apply_transition(order, status):
+    if order is None:
+        return 'order_not_found'
+    if order.status == status:
+        return 'unchanged'
+    if order.status not in TRANSITIONS[status]:
+        return 'rejected'
+    order.status = status
+    return 'applied'
+
+
+def apply_pending(batch_size=200):
+    """Aplica um lote de eventos pendentes numa transação. Retorna quantos processou."""
+    seqs = _claim(batch_size)
+    if not seqs:
+        return 0
+    try:
+        _apply(PaymentEvent.query.filter(PaymentEvent.seq.in_(seqs)).order_by(PaymentEvent.seq).all())
+        return len(seqs)
+    except Exception:
+        db.session.rollback()  # devolve o lote inteiro à fila
+
+    # Um evento com problema não pode travar a fila para sempre: refaz um a
+    # um e marca como rejeitado o que falhar sozinho
+    for seq in seqs:
+        if not _claim(seq=seq):
+            continue  # já aplicado por outro processo
+        try:
+            _apply([db.session.get(PaymentEvent, seq)])
+        except Exception:
+            db.session.rollback()
+            current_app.logger.exception('Evento de pagamento %s rejeitado', seq)
+            # Se nem isso grava (banco fora do ar), o erro sobe e o lote é refeito depois
+            db.session.execute(
+                PAYMENT_EVENT_TABLE.update()
+                .where(PAYMENT_EVENT_TABLE.c.seq == seq, PAYMENT_EVENT_TABLE.c.processed_at.is_(None))
+                .values(result='rejected', processed_at=datetime.utcnow()))
+            db.session.commit()
+    return len(seqs)
+
+
+def _claim(limit=None, seq=None):
+    """
+    Reserva eventos pendentes para esta transação e devolve seus seqs.
+
+    O UPDATE marca processed_at só onde ele ainda é nulo, então cada evento é
+    reservado por um único processo; o commit (ou rollback) de _apply confirma
+    (ou devolve) a reserva. É a primeira escrita da transação: no SQLite ela
+    já pega o lock de escrita, no Postgres SKIP LOCKED faz os outros processos
+    pegarem os eventos seguintes em vez de esperar.
+    """
+    table = PAYMENT_EVENT_TABLE
+    pending = select(table.c.seq).where(table.c.processed_at.is_(None))
+    if seq is not None:
+        pending = pending.where(table.c.seq == seq)
+    pending = pending.order_by(table.c.seq).limit(limit).with_for_update(skip_locked=True)
+    stmt = (table.update()
+            .where(table.c.seq.in_(pending.scalar_subquery()), table.c.processed_at.is_(None))
+            .values(processed_at=datetime.utcnow())
+            .returning(table.c.seq))
+    return sorted(db.session.execute(stmt).scalars())
+
+
+def _apply(events):
+    # Uma consulta por lote, em vez de uma busca por evento
+    # FOR UPDATE: o status lido é o que a transição vai substituir, mesmo com um
+    # checkout ou outro evento do mesmo pedido em paralelo (no SQLite o lock de
+    # escrita da reserva já serializa)
+    by_payment = {order.payment_id: order for order in
+                  Order.query.filter(Order.payment_id.in_({e.payment_id for e in events})).with_for_update()}
+    references = {_order_reference(e) for e in events if e.payment_id not in by_payment} - {None}
+    by_id = {}
+    if references:
+        by_id = {order.id: order for order in
+                 Order.query.filter(Order.id.in_(references)).with_for_update()}
+
+    now = datetime.utcnow()
+    for event in events:
+        order = by_payment.get(event.payment_id) or by_id.get(_order_reference(event))
+        if order is not None and order.payment_id is None:
+            order.payment_id = event.payment_id
+            by_payment[event.payment_id] = order
+        event.result = apply_transition(order, event.status)
+        event.processed_at = now
+    # Os agregados do painel acompanham a mudança de status no flush (stats.py)
+    db.session.commit()
+
+
+class PaymentEventProcessor:
+    """
+    Thread que drena a outbox. notify() acorda a thread logo após gravar um
+    evento; sem notificações, ela confere a tabela a cada poll_interval.
+
+    Com vários processos (workers do serve.py, `flask payments-apply`), cada
+    evento é reservado por um só deles antes de ser aplicado (ver _claim).
+    """
+
+    def __init__(self, app=None, batch_size=200, max_delay=0.05, poll_interval=5.0):
+        self.app = app
+        self.batch_size = batch_size
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Event()
+        self._worker = BackgroundThread('payment-events', self._run, on_fork=self._reset)
+
+    def notify(self):
+        self._worker.ensure_started()
+        self._wakeup.set()
+
+    def _reset(self):
+        self._wakeup = threading.Event()
+
+    def _run(self):
+        while True:
+            # Espera um pouco para que uma rajada de eventos caia no mesmo lote
+            time.sleep(self.max_delay)
+            self._wakeup.clear()
+            with self.app.app_context():
+                try:
+                    processed = apply_pending(self.batch_size)
+                except Exception:
+                    db.session.rollback()
+                    self.app.logger.exception('Falha ao aplicar eventos de pagamento')
+                    processed = 0
+            if processed < self.batch_size:
+                self._wakeup.wait(self.poll_interval)